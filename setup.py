@@ -9,5 +9,6 @@ setup(
     author_email="dongjian413@gmail.com",
     license="Private",
     packages=["uniview"],
+    extras_require={"parquet": ["pyarrow>=5.0.0"]},
     zip_safe=False,
 )
@@ -0,0 +1,16 @@
+import os
+import sys
+
+
+# the example is not an installed package, so its modules are imported the
+# same way its scripts import them
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        "uniview",
+        "fiftyone",
+        "examples",
+        "open_images_evaluation",
+    ),
+)
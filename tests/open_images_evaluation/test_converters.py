@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("fiftyone")
+
+from error_analysis.synthetic import make_synthetic_open_images  # noqa: E402
+
+from error_analysis.load_data import (  # noqa: E402
+    ANNOTATION_DTYPES,
+    classifications2df,
+    detections2df,
+    df2classifications,
+    df2detections,
+)
+
+
+@pytest.fixture(scope="module")
+def synthetic_paths(tmp_path_factory):
+    return make_synthetic_open_images(
+        str(tmp_path_factory.mktemp("synthetic")),
+        num_images=20,
+        num_classes=10,
+        write_images=False,
+    )
+
+
+def test_detections_round_trip(synthetic_paths):
+    boxes = pd.read_csv(
+        synthetic_paths["bounding_boxes_path"], dtype=ANNOTATION_DTYPES
+    )
+    image_ids = boxes["ImageID"].unique()
+    assert len(image_ids) == 20
+
+    for image_id, df in boxes.groupby("ImageID", sort=False):
+        detections = df2detections(df)
+        assert len(detections.detections) == len(df)
+
+        df2 = detections2df(image_id, detections, is_groundtruth=True)
+        assert df2["LabelName"].tolist() == df["LabelName"].tolist()
+        assert df2["IsGroupOf"].tolist() == df["IsGroupOf"].tolist()
+        for col in ("Confidence", "XMin", "XMax", "YMin", "YMax"):
+            np.testing.assert_allclose(
+                df2[col].to_numpy(), df[col].to_numpy(), atol=1e-6
+            )
+
+
+def test_classifications_round_trip(synthetic_paths):
+    labels = pd.read_csv(
+        synthetic_paths["image_labels_path"], dtype=ANNOTATION_DTYPES
+    )
+
+    for image_id, df in labels.groupby("ImageID", sort=False):
+        classifications = df2classifications(df)
+        confidences = [c.confidence for c in classifications.classifications]
+        assert confidences == df["Confidence"].tolist()
+        assert all(isinstance(c, int) for c in confidences)
+
+        df2 = classifications2df(image_id, classifications)
+        assert df2["LabelName"].tolist() == df["LabelName"].tolist()
+        assert (
+            df2["ConfidenceImageLabel"].tolist() == df["Confidence"].tolist()
+        )
+
+
+def test_empty_detections():
+    df = detections2df("0000000000000000", None)
+    assert df.empty
+    assert "Score" in df
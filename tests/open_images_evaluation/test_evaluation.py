@@ -0,0 +1,399 @@
+import uuid
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("fiftyone")
+
+from error_analysis.synthetic import make_synthetic_open_images  # noqa: E402
+
+import fiftyone as fo  # noqa: E402
+
+import error_analysis.evaluation as evaluation  # noqa: E402
+from error_analysis.evaluation import (  # noqa: E402
+    FINGERPRINT_FIELD,
+    TensorflowObjectDetectionAPIEvaluator,
+    _SampleValuesWriter,
+    _compute_fingerprints,
+    _select_changed_samples,
+    evaluate_dataset,
+    get_backend,
+    get_backend_names,
+    register_backend,
+)
+import error_analysis.labelmap as labelmap  # noqa: E402
+from error_analysis.load_data import (  # noqa: E402
+    add_open_images_predictions,
+    load_open_images_dataset,
+)
+from error_analysis.numpy_evaluation import (  # noqa: E402
+    NumpyObjectDetectionEvaluator,
+)
+
+
+@pytest.fixture
+def dataset():
+    dataset = fo.Dataset()
+    dataset.add_samples(
+        [
+            fo.Sample(
+                filepath="/images/%d.jpg" % i,
+                groundtruth_detections=fo.Detections(
+                    detections=[
+                        fo.Detection(
+                            label="Cat",
+                            bounding_box=[0.1, 0.1, 0.4, 0.4],
+                            IsGroupOf=0,
+                        )
+                    ]
+                ),
+                groundtruth_image_labels=fo.Classifications(
+                    classifications=[
+                        fo.Classification(label="Cat", confidence=1)
+                    ]
+                ),
+                predicted_detections=fo.Detections(
+                    detections=[
+                        fo.Detection(
+                            label="Cat",
+                            bounding_box=[0.1, 0.1, 0.4, 0.3],
+                            confidence=0.1 * (i + 1),
+                        )
+                    ]
+                ),
+            )
+            for i in range(3)
+        ]
+    )
+
+    yield dataset
+
+    dataset.delete()
+
+
+@pytest.fixture(scope="module")
+def synthetic_paths(tmp_path_factory):
+    output_dir = tmp_path_factory.mktemp("synthetic")
+    paths = make_synthetic_open_images(
+        str(output_dir), num_images=25, num_classes=5
+    )
+
+    # a second model that keeps every other prediction with other scores
+    predictions = pd.read_csv(paths["predictions_path"])
+    predictions = predictions.iloc[::2].copy()
+    predictions["Score"] = 1 - predictions["Score"]
+    paths["other_predictions_path"] = str(output_dir / "other.csv")
+    predictions.to_csv(paths["other_predictions_path"], index=False)
+
+    return paths
+
+
+@pytest.fixture
+def make_dataset(synthetic_paths):
+    datasets = []
+
+    def _make_dataset():
+        dataset = load_open_images_dataset(
+            "open-images-test-%s" % uuid.uuid4().hex,
+            synthetic_paths["images_dir"],
+            bounding_boxes_path=synthetic_paths["bounding_boxes_path"],
+            image_labels_path=synthetic_paths["image_labels_path"],
+            predictions_path=synthetic_paths["predictions_path"],
+            class_descriptions_path=synthetic_paths["class_descriptions_path"],
+        )
+        add_open_images_predictions(
+            dataset,
+            synthetic_paths["other_predictions_path"],
+            class_descriptions_path=synthetic_paths["class_descriptions_path"],
+            prediction_field_name="other_predictions",
+        )
+        datasets.append(dataset)
+        return dataset
+
+    yield _make_dataset
+
+    for dataset in datasets:
+        dataset.delete()
+
+
+@pytest.fixture
+def eval_kwargs(tmp_path):
+    label_map_path = tmp_path / "label_map.pbtxt"
+    label_map_path.write_text(
+        'item { name: "/m/01yrx" id: 1 display_name: "Cat" }\n'
+    )
+
+    return {
+        "label_map_path": str(label_map_path),
+        "cache_dir": None,
+        "groundtruth_loc_field_name": "groundtruth_detections",
+        "groundtruth_img_labels_field_name": "groundtruth_image_labels",
+        "prediction_field_name": "predicted_detections",
+        "iou_threshold": 0.5,
+        "backend": "numpy",
+        "split_predictions": False,
+        "slices": None,
+    }
+
+
+def _get_changed_ids(dataset, eval_kwargs):
+    fingerprints = _compute_fingerprints(dataset, eval_kwargs)
+    return _select_changed_samples(dataset, fingerprints).values("id")
+
+
+def _store_fingerprints(dataset, eval_kwargs):
+    fingerprints = _compute_fingerprints(dataset, eval_kwargs)
+    dataset.set_values(
+        FINGERPRINT_FIELD,
+        [fingerprints[sample_id] for sample_id in dataset.values("id")],
+    )
+
+
+def test_unchanged_samples_are_skipped(dataset, eval_kwargs):
+    sample_ids = dataset.values("id")
+    assert sorted(_get_changed_ids(dataset, eval_kwargs)) == sorted(sample_ids)
+
+    _store_fingerprints(dataset, eval_kwargs)
+    assert _get_changed_ids(dataset, eval_kwargs) == []
+
+    # writing back results does not change the fingerprints
+    dataset.set_values("open_images_mAP", [0.5] * len(sample_ids))
+    dataset.set_values(
+        "predicted_detections.detections.eval",
+        [["TP"] for _ in sample_ids],
+    )
+    assert _get_changed_ids(dataset, eval_kwargs) == []
+
+
+def test_changed_samples_are_evaluated(dataset, eval_kwargs):
+    sample_ids = dataset.values("id")
+    _store_fingerprints(dataset, eval_kwargs)
+
+    confidences = dataset.values("predicted_detections.detections.confidence")
+    confidences[1] = [0.95]
+    dataset.set_values(
+        "predicted_detections.detections.confidence", confidences
+    )
+    assert _get_changed_ids(dataset, eval_kwargs) == [sample_ids[1]]
+
+    _store_fingerprints(dataset, eval_kwargs)
+    assert _get_changed_ids(dataset, eval_kwargs) == []
+
+    # every sample changes with the evaluation config or the label map
+    kwargs = dict(eval_kwargs, iou_threshold=0.7)
+    assert sorted(_get_changed_ids(dataset, kwargs)) == sorted(sample_ids)
+
+    with open(eval_kwargs["label_map_path"], "a") as f:
+        f.write('item { name: "/m/0bt9lr" id: 2 display_name: "Dog" }\n')
+
+    changed_ids = _get_changed_ids(dataset, eval_kwargs)
+    assert sorted(changed_ids) == sorted(sample_ids)
+
+
+def test_register_backend(monkeypatch):
+    assert get_backend_names() == ["numpy", "tensorflow"]
+
+    monkeypatch.setattr(evaluation, "_BACKENDS", dict(evaluation._BACKENDS))
+    register_backend("custom", NumpyObjectDetectionEvaluator)
+    assert get_backend_names() == ["custom", "numpy", "tensorflow"]
+    assert get_backend("custom") is NumpyObjectDetectionEvaluator
+
+    with pytest.raises(ValueError):
+        get_backend("unknown")
+
+
+def test_labelmap_is_parsed_once(
+    make_dataset, synthetic_paths, tmp_path, monkeypatch
+):
+    dataset = make_dataset()
+
+    # a copy that is not memoized yet
+    label_map_path = str(tmp_path / "label_map.pbtxt")
+    with open(synthetic_paths["label_map_path"]) as src:
+        with open(label_map_path, "w") as dst:
+            dst.write(src.read())
+
+    cache_dir = str(tmp_path / "cache")
+    num_parses = _count_calls(monkeypatch, labelmap, "parse_labelmap")
+
+    # all backends share the label maps memoized per process
+    evaluate_dataset(
+        dataset, label_map_path, backend="numpy", cache_dir=cache_dir
+    )
+    TensorflowObjectDetectionAPIEvaluator.load_labelmap(label_map_path)
+    assert num_parses() == 1
+
+    # other processes load them from the cache
+    monkeypatch.setattr(labelmap, "_COMPILED_LABELMAPS", {})
+    evaluate_dataset(
+        dataset, label_map_path, backend="numpy", cache_dir=cache_dir
+    )
+    assert num_parses() == 1
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_sample_values_writer(dataset, reverse):
+    sample_ids = dataset.values("id")
+    samples = dataset
+    if reverse:
+        samples = dataset.select(sample_ids[::-1], ordered=True)
+
+    # the last batch only contains one sample
+    writer = _SampleValuesWriter(samples, 2)
+    for sample in samples:
+        i = sample_ids.index(sample.id)
+        writer.add(
+            sample.id,
+            {
+                "open_images_mAP": i / 10,
+                "predicted_detections.detections.eval": ["TP" * (i + 1)],
+            },
+        )
+
+    writer.flush()
+
+    assert dataset.values("open_images_mAP") == [0, 0.1, 0.2]
+    assert dataset.values("predicted_detections.detections.eval") == [
+        ["TP"],
+        ["TPTP"],
+        ["TPTPTP"],
+    ]
+
+
+def test_multiple_prediction_fields(
+    make_dataset, synthetic_paths, monkeypatch
+):
+    field_names = ["predicted_detections", "other_predictions"]
+    iou_thresholds = [0.5, 0.75]
+
+    dataset = make_dataset()
+    num_conversions = _count_calls(
+        monkeypatch, evaluation, "classifications2df"
+    )
+    metrics = evaluate_dataset(
+        dataset,
+        synthetic_paths["label_map_path"],
+        prediction_field_name=field_names,
+        iou_threshold=iou_thresholds,
+        backend="numpy",
+    )
+    monkeypatch.undo()
+
+    # the ground truth of each sample is converted once for all fields
+    assert num_conversions() == len(dataset)
+
+    for field_name in field_names:
+        single_dataset = make_dataset()
+        single_metrics = evaluate_dataset(
+            single_dataset,
+            synthetic_paths["label_map_path"],
+            prediction_field_name=field_name,
+            iou_threshold=iou_thresholds,
+            backend="numpy",
+        )
+        assert metrics[field_name] == single_metrics
+
+        # the per-sample results are prefixed by the field name
+        for suffix in ("_50", "_75"):
+            for name in ("mAP", "AP_per_class"):
+                assert dataset.values(
+                    field_name + "_" + name + suffix
+                ) == single_dataset.values(name + suffix)
+
+            eval_field = field_name + ".detections.eval" + suffix
+            assert dataset.values(eval_field) == single_dataset.values(
+                eval_field
+            )
+
+
+def _count_calls(monkeypatch, module, name):
+    fcn = getattr(module, name)
+    calls = []
+
+    def _fcn(*args, **kwargs):
+        calls.append(args)
+        return fcn(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, _fcn)
+    return lambda: len(calls)
+
+
+@pytest.mark.parametrize("use_view", [False, True])
+def test_parallel_evaluation(make_dataset, synthetic_paths, use_view):
+    def _evaluate(num_workers):
+        dataset = make_dataset()
+        samples = dataset
+        if use_view:
+            # the workers rebuild the view from its stages
+            samples = dataset.select(dataset.values("id")[::2])
+
+        metrics = evaluate_dataset(
+            samples,
+            synthetic_paths["label_map_path"],
+            iou_threshold=[0.5, 0.75],
+            backend="numpy",
+            num_workers=num_workers,
+            shard_size=4,
+            batch_size=3,
+        )
+        return metrics, dataset
+
+    metrics, dataset = _evaluate(0)
+    parallel_metrics, parallel_dataset = _evaluate(2)
+
+    assert parallel_metrics == metrics
+    for field_name in (
+        "mAP_50",
+        "AP_per_class_75",
+        "predicted_detections.detections.eval_50",
+        "predicted_detections.detections.eval_75",
+    ):
+        assert parallel_dataset.values(field_name) == dataset.values(
+            field_name
+        )
+
+
+def test_split_predictions(make_dataset, synthetic_paths):
+    dataset = make_dataset()
+    evaluate_dataset(
+        dataset,
+        synthetic_paths["label_map_path"],
+        iou_threshold=[0.5, 0.75],
+        backend="numpy",
+        split_predictions=True,
+    )
+
+    predictions = dataset.values("predicted_detections")
+    for suffix in ("_50", "_75"):
+        evals = dataset.values("predicted_detections.detections.eval" + suffix)
+        for field_suffix, verdict in (
+            ("_TP", "true_positive"),
+            ("_FP", "false_positive"),
+        ):
+            field_name = "predicted_detections" + field_suffix + suffix
+            for detections, sample_evals, split in zip(
+                predictions, evals, dataset.values(field_name)
+            ):
+                # the split field contains the predictions with the verdict,
+                # in order, and is empty if there are none
+                expected = [
+                    _get_key(det)
+                    for det, value in zip(detections.detections, sample_evals)
+                    if value == verdict
+                ]
+                if not expected:
+                    assert split is None
+                    continue
+
+                assert [_get_key(det) for det in split.detections] == expected
+                for det in split.detections:
+                    assert det["eval" + suffix] == verdict
+
+
+def _get_key(detection):
+    return (
+        detection.label,
+        tuple(detection.bounding_box),
+        detection.confidence,
+    )
@@ -0,0 +1,181 @@
+import pytest
+
+from error_analysis.labelmap import compile_labelmap, parse_labelmap
+
+
+def test_parse_labelmap():
+    items = parse_labelmap(
+        """
+        # a comment
+        item {
+          name: "/m/01"  # a trailing comment
+          id: 1
+          display_name: "Curly } brace"
+        }
+        item: {
+          name: '/m/02'; id: 2, display_name: "Quoted \\"name\\""
+          frequency: FREQUENT
+          instance_count: 3
+          ancestor_ids: 1
+          keypoints { id: 0 label: "nose" }
+        }
+        item {
+          id: 3
+        }
+        """
+    )
+
+    assert items == [
+        {"name": "/m/01", "id": 1, "display_name": "Curly } brace"},
+        {"name": "/m/02", "id": 2, "display_name": 'Quoted "name"'},
+        {"name": "", "id": 3, "display_name": ""},
+    ]
+
+
+def test_parse_labelmap_syntax():
+    items = parse_labelmap(
+        r"""
+        item: [{ name: "caf\303\251" id: 0x10 }, < name: "\x41" 'b' id: 010 >]
+        item {
+          display_name: "\u00e9\t\"\\"
+          id: -3
+          frequency: 1
+          ancestor_ids: [1, 2]
+          keypoints [{ id: 0 }, { id: 1 }]
+        }
+        """
+    )
+
+    assert items == [
+        {"name": "caf\u00e9", "id": 16, "display_name": ""},
+        {"name": "Ab", "id": 8, "display_name": ""},
+        {"name": "", "id": -3, "display_name": '\u00e9\t"\\'},
+    ]
+
+
+def test_parse_empty_labelmap():
+    assert parse_labelmap("") == []
+    assert parse_labelmap("# no items\n") == []
+
+
+@pytest.mark.parametrize(
+    "label_map_string",
+    [
+        'item { name: "a" } trailing',
+        'item { name: "a" } }',
+        'item { name: "a"',
+        'item { name "a" }',
+        'item { nmae: "a" }',
+        'item { id: "1" }',
+        "item { id: 1.5 }",
+        'item { name: "unterminated }',
+        'item { name: "\\303" }',
+        'item { name: "\\777" }',
+        'item { name: "\\q" }',
+        'item { name: ["a"] }',
+        "item { id: 09 }",
+        'label { name: "a" }',
+        "@",
+    ],
+)
+def test_parse_invalid_labelmap(label_map_string):
+    with pytest.raises(ValueError):
+        parse_labelmap(label_map_string)
+
+
+def test_compile_labelmap(tmp_path):
+    labelmap_path = tmp_path / "label_map.pbtxt"
+    labelmap_path.write_text(
+        'item { name: "/m/01" id: 1 display_name: "Cat" }\n'
+        'item { name: "/m/02" id: 2 display_name: "Dog" }\n'
+    )
+    cache_dir = str(tmp_path / "cache")
+
+    labelmap = compile_labelmap(str(labelmap_path), cache_dir=cache_dir)
+
+    assert labelmap.names.tolist() == ["/m/01", "/m/02"]
+    assert labelmap.ids.tolist() == [1, 2]
+    assert labelmap.display_names.tolist() == ["Cat", "Dog"]
+
+
+LABEL_MAP_STRINGS = [
+    'item { name: "/m/01" id: 1 display_name: "Cat" }',
+    'item { name: "caf\\303\\251" display_name: "\\xc3\\xa9" }',
+    'item { name: "a" "b" \'c\' display_name: "\\U0001F600" }',
+    'item { display_name: "\\a\\b\\f\\n\\r\\t\\v\\\\\\"\\\'" }',
+    'item { name: "\u00e9" id: 0x1F } item < id: 017 >',
+    "item: [{ id: -1 }, { id: +2 ancestor_ids: [3, 4] frequency: RARE }]",
+    "item { keypoints [{ id: 1 label: 'nose' }] instance_count: 5; }",
+    'item { id: 1 id: 2 name: "a", }',
+]
+
+
+def _get_label_map_class():
+    descriptor_pb2 = pytest.importorskip("google.protobuf.descriptor_pb2")
+    from google.protobuf import descriptor_pool, message_factory
+
+    # the StringIntLabelMap message of the Tensorflow Object Detection API
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name="string_int_label_map.proto", package="test", syntax="proto2"
+    )
+    keypoint = file_proto.message_type.add(name="Keypoint")
+    keypoint.field.add(name="id", number=1, type=5, label=1)
+    keypoint.field.add(name="label", number=2, type=9, label=1)
+    frequency = file_proto.enum_type.add(name="LVISFrequency")
+    for number, name in enumerate(
+        ["UNSPECIFIED", "FREQUENT", "COMMON", "RARE"]
+    ):
+        frequency.value.add(name=name, number=number)
+
+    item = file_proto.message_type.add(name="StringIntLabelMapItem")
+    item.field.add(name="name", number=1, type=9, label=1)
+    item.field.add(name="id", number=2, type=5, label=1)
+    item.field.add(name="display_name", number=3, type=9, label=1)
+    item.field.add(
+        name="keypoints",
+        number=4,
+        type=11,
+        label=3,
+        type_name=".test.Keypoint",
+    )
+    item.field.add(name="ancestor_ids", number=5, type=5, label=3)
+    item.field.add(name="descendant_ids", number=6, type=5, label=3)
+    item.field.add(
+        name="frequency",
+        number=7,
+        type=14,
+        label=1,
+        type_name=".test.LVISFrequency",
+    )
+    item.field.add(name="instance_count", number=8, type=5, label=1)
+    label_map = file_proto.message_type.add(name="StringIntLabelMap")
+    label_map.field.add(
+        name="item",
+        number=1,
+        type=11,
+        label=3,
+        type_name=".test.StringIntLabelMapItem",
+    )
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    descriptor = pool.FindMessageTypeByName("test.StringIntLabelMap")
+
+    # protobuf<4.21 does not have GetMessageClass()
+    if hasattr(message_factory, "GetMessageClass"):
+        return message_factory.GetMessageClass(descriptor)
+
+    return message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+
+@pytest.mark.parametrize("label_map_string", LABEL_MAP_STRINGS)
+def test_parse_labelmap_like_protobuf(label_map_string):
+    label_map_cls = _get_label_map_class()
+    from google.protobuf import text_format
+
+    label_map = text_format.Merge(label_map_string, label_map_cls())
+
+    assert parse_labelmap(label_map_string) == [
+        {"name": item.name, "id": item.id, "display_name": item.display_name}
+        for item in label_map.item
+    ]
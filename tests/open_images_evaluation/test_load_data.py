@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("fiftyone")
+
+from error_analysis.synthetic import make_synthetic_open_images  # noqa: E402
+
+import fiftyone.core.labels as fol  # noqa: E402
+
+from error_analysis.load_data import (  # noqa: E402
+    ANNOTATION_DTYPES,
+    CLASSIFICATION_COLUMNS,
+    DETECTION_COLUMNS,
+    _ImageIndex,
+    _iter_image_groups,
+    df2classifications,
+    df2detections,
+)
+
+
+@pytest.fixture(scope="module")
+def synthetic_paths(tmp_path_factory):
+    return make_synthetic_open_images(
+        str(tmp_path_factory.mktemp("synthetic")),
+        num_images=20,
+        num_classes=10,
+        write_images=False,
+    )
+
+
+@pytest.fixture(scope="module")
+def boxes(synthetic_paths):
+    return pd.read_csv(
+        synthetic_paths["bounding_boxes_path"], dtype=ANNOTATION_DTYPES
+    )
+
+
+def _get_rows(df, image_id):
+    return df[df["ImageID"] == image_id].reset_index(drop=True)
+
+
+def test_image_index(boxes):
+    # shuffle the rows so that the index has to sort them
+    df = boxes.sample(frac=1, random_state=0)
+    index = _ImageIndex(df)
+
+    image_ids = df["ImageID"].unique()
+    assert sorted(index.image_ids) == sorted(image_ids)
+
+    # the rows of each image keep their original order
+    for image_id in image_ids:
+        pd.testing.assert_frame_equal(
+            index.get(image_id).reset_index(drop=True), _get_rows(df, image_id)
+        )
+
+    assert index.get("missing") is None
+    assert _ImageIndex(df.iloc[:0]).get(image_ids[0]) is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10, 1000])
+def test_iter_image_groups(synthetic_paths, boxes, chunk_size):
+    groups = list(
+        _iter_image_groups(synthetic_paths["bounding_boxes_path"], chunk_size)
+    )
+
+    # every image is yielded once, in ImageID order, even when its rows
+    # straddle chunk boundaries
+    image_ids = [image_id for image_id, _ in groups]
+    assert image_ids == sorted(boxes["ImageID"].unique())
+
+    # chunks have different categories, so concatenated rows lose the
+    # categorical dtype
+    for image_id, df in groups:
+        pd.testing.assert_frame_equal(
+            df.reset_index(drop=True),
+            _get_rows(boxes, image_id),
+            check_dtype=False,
+            check_categorical=False,
+        )
+
+
+def test_iter_image_groups_unsorted(boxes, tmp_path):
+    csv_path = str(tmp_path / "unsorted.csv")
+    boxes.iloc[::-1].to_csv(csv_path, index=False)
+
+    with pytest.raises(ValueError):
+        list(_iter_image_groups(csv_path, 1000))
+
+
+def _df2detections_rowwise(df):
+    # the original row by row implementation of df2detections
+    supplemental_columns = [fn for fn in DETECTION_COLUMNS if fn in df]
+    return [
+        fol.Detection(
+            label=row.LabelName,
+            confidence=row.Confidence,
+            bounding_box=[
+                row.XMin,
+                row.YMin,
+                row.XMax - row.XMin,
+                row.YMax - row.YMin,
+            ],
+            **{sc: row[sc] for sc in supplemental_columns},
+        )
+        for _, row in df.iterrows()
+    ]
+
+
+def _df2classifications_rowwise(df):
+    # the original row by row implementation of df2classifications
+    supplemental_columns = [fn for fn in CLASSIFICATION_COLUMNS if fn in df]
+    return [
+        fol.Classification(
+            label=row.LabelName,
+            confidence=row.Confidence,
+            **{sc: row[sc] for sc in supplemental_columns},
+        )
+        for _, row in df.iterrows()
+    ]
+
+
+def _get_values(labels, fields):
+    return [[label[field] for field in fields] for label in labels]
+
+
+def test_df2detections(boxes):
+    fields = ["label", "confidence", "bounding_box"] + DETECTION_COLUMNS
+    for _, df in boxes.groupby("ImageID", sort=False):
+        detections = df2detections(df).detections
+        assert _get_values(detections, fields) == _get_values(
+            _df2detections_rowwise(df), fields
+        )
+
+
+def test_df2classifications(synthetic_paths):
+    labels = pd.read_csv(
+        synthetic_paths["image_labels_path"], dtype=ANNOTATION_DTYPES
+    )
+
+    fields = ["label", "confidence"] + CLASSIFICATION_COLUMNS
+    for _, df in labels.groupby("ImageID", sort=False):
+        classifications = df2classifications(df).classifications
+        assert _get_values(classifications, fields) == _get_values(
+            _df2classifications_rowwise(df), fields
+        )
@@ -0,0 +1,473 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from error_analysis.numpy_evaluation import (
+    FALSE_POSITIVE,
+    IGNORED,
+    MISSING_SLICE_VALUE,
+    TRUE_POSITIVE,
+    DatasetMetricsAccumulator,
+    NumpyObjectDetectionEvaluator,
+    _match_trivial_image,
+    compute_average_precision,
+    compute_ioa,
+    compute_iou,
+    compute_slice_stats,
+    get_slice_values,
+    get_TP_FP_indexes,
+    match_detections,
+    match_image,
+    parse_groundtruth,
+)
+
+
+CLASS_LABEL_MAP = {"cat": 1, "dog": 2, "bird": 3}
+REVERSE_LABEL_MAP = {v: k for k, v in CLASS_LABEL_MAP.items()}
+
+
+def _make_groundtruth(boxes=(), image_labels=()):
+    # boxes are (label, xmin, xmax, ymin, ymax, is_group_of) tuples and image
+    # labels are (label, confidence) tuples
+    rows = [
+        {
+            "ImageID": "0",
+            "LabelName": label,
+            "XMin": xmin,
+            "XMax": xmax,
+            "YMin": ymin,
+            "YMax": ymax,
+            "IsGroupOf": is_group_of,
+            "ConfidenceImageLabel": np.nan,
+        }
+        for label, xmin, xmax, ymin, ymax, is_group_of in boxes
+    ]
+    rows += [
+        {
+            "ImageID": "0",
+            "LabelName": label,
+            "XMin": np.nan,
+            "XMax": np.nan,
+            "YMin": np.nan,
+            "YMax": np.nan,
+            "IsGroupOf": np.nan,
+            "ConfidenceImageLabel": confidence,
+        }
+        for label, confidence in image_labels
+    ]
+    columns = [
+        "ImageID",
+        "LabelName",
+        "XMin",
+        "XMax",
+        "YMin",
+        "YMax",
+        "IsGroupOf",
+        "ConfidenceImageLabel",
+    ]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _make_predictions(detections=()):
+    # detections are (label, score, xmin, xmax, ymin, ymax) tuples
+    columns = ["ImageID", "LabelName", "Score", "XMin", "XMax", "YMin", "YMax"]
+    return pd.DataFrame(
+        [("0",) + tuple(det) for det in detections], columns=columns
+    )
+
+
+def _match(groundtruth, predictions, iou_thresholds=(0.5,)):
+    return match_image(
+        groundtruth, predictions, CLASS_LABEL_MAP, list(iou_thresholds)
+    )
+
+
+def test_match_detections_duplicates():
+    iou = np.array([[0.9, 0.0], [0.8, 0.1], [0.0, 0.4]])
+    ioa = np.zeros((3, 0))
+    scores = np.array([0.9, 0.8, 0.7])
+
+    verdicts, pr_scores, pr_labels, matches = match_detections(
+        iou, ioa, scores, 0.5
+    )
+
+    # the second prediction is a duplicate of the first and the third does
+    # not overlap enough
+    assert verdicts.tolist() == [
+        TRUE_POSITIVE,
+        FALSE_POSITIVE,
+        FALSE_POSITIVE,
+    ]
+    assert pr_scores.tolist() == [0.9, 0.8, 0.7]
+    assert pr_labels.tolist() == [1.0, 0.0, 0.0]
+    assert matches.tolist() == [0, -1, -1]
+
+
+def test_match_detections_group_of():
+    # one non-group-of box and one group-of box
+    iou = np.array([[0.0], [0.9], [0.0], [0.0], [0.1]])
+    ioa = np.array([[0.9], [1.0], [0.8], [0.6], [0.2]])
+    scores = np.array([0.9, 0.8, 0.7, 0.6, 0.5])
+
+    verdicts, pr_scores, pr_labels, matches = match_detections(
+        iou, ioa, scores, 0.5
+    )
+
+    # the box match is not grouped, the highest scoring prediction inside
+    # the group-of box represents it and the others are ignored
+    assert verdicts.tolist() == [
+        TRUE_POSITIVE,
+        TRUE_POSITIVE,
+        IGNORED,
+        IGNORED,
+        FALSE_POSITIVE,
+    ]
+    assert pr_scores.tolist() == [0.8, 0.5, 0.9]
+    assert pr_labels.tolist() == [1.0, 0.0, 1.0]
+    assert matches.tolist() == [1, 0, 1, 1, -1]
+
+
+def test_match_detections_group_of_zero_score():
+    verdicts, pr_scores, pr_labels, _ = match_detections(
+        np.zeros((1, 0)), np.ones((1, 1)), np.zeros(1), 0.5
+    )
+
+    # a group-of box is not represented by a prediction with zero score
+    assert verdicts.tolist() == [IGNORED]
+    assert pr_scores.size == 0
+    assert pr_labels.size == 0
+
+
+def test_match_image_score_ties():
+    groundtruth = _make_groundtruth(boxes=[("cat", 0.1, 0.5, 0.1, 0.5, 0)])
+    predictions = _make_predictions(
+        [("cat", 0.5, 0.1, 0.5, 0.1, 0.5), ("cat", 0.5, 0.1, 0.5, 0.1, 0.5)]
+    )
+
+    (records,) = _match(groundtruth, predictions)
+    true_positives, false_positives = get_TP_FP_indexes(records, predictions)
+
+    # ties are broken like the TF evaluator, by reversing an argsort
+    tie_order = np.argsort(np.array([0.5, 0.5]))[::-1]
+    assert true_positives == [tie_order[0]]
+    assert false_positives == [tie_order[1]]
+
+
+def test_match_image_drops_invalid_boxes():
+    groundtruth = _make_groundtruth(boxes=[("cat", 0.1, 0.5, 0.1, 0.5, 0)])
+    predictions = _make_predictions(
+        [
+            ("cat", 0.9, 0.5, 0.1, 0.1, 0.5),
+            ("cat", 0.8, 0.1, 0.5, 0.5, 0.5),
+            ("cat", 0.7, 0.1, 0.5, 0.1, 0.5),
+        ]
+    )
+
+    (records,) = _match(groundtruth, predictions)
+
+    assert len(records) == 1
+    _, num_gt, pr_scores, pr_labels, rows, verdicts, _ = records[0]
+    assert num_gt == 1
+    assert rows.tolist() == [2]
+    assert verdicts.tolist() == [TRUE_POSITIVE]
+    assert pr_scores.tolist() == [0.7]
+    assert pr_labels.tolist() == [1.0]
+
+
+def test_match_image_ignores_unverified_classes():
+    groundtruth = _make_groundtruth(
+        boxes=[("cat", 0.1, 0.5, 0.1, 0.5, 0)], image_labels=[("dog", 0)]
+    )
+    predictions = _make_predictions(
+        [
+            ("cat", 0.9, 0.6, 0.9, 0.6, 0.9),
+            ("dog", 0.8, 0.1, 0.5, 0.1, 0.5),
+            ("bird", 0.7, 0.1, 0.5, 0.1, 0.5),
+        ]
+    )
+
+    (records,) = _match(groundtruth, predictions)
+    true_positives, false_positives = get_TP_FP_indexes(records, predictions)
+
+    # the negatively verified dog is a false positive, the bird is not
+    # evaluated at all
+    assert sorted(REVERSE_LABEL_MAP[r[0]] for r in records) == ["cat", "dog"]
+    assert true_positives == []
+    assert sorted(false_positives) == [0, 1]
+
+
+def test_match_image_thresholds():
+    groundtruth = _make_groundtruth(boxes=[("cat", 0.1, 0.5, 0.1, 0.5, 0)])
+    predictions = _make_predictions([("cat", 0.9, 0.1, 0.5, 0.1, 0.4)])
+
+    # the IoU is 0.75
+    records50, records90 = _match(
+        groundtruth, predictions, iou_thresholds=[0.5, 0.9]
+    )
+
+    assert records50[0][5].tolist() == [TRUE_POSITIVE]
+    assert records90[0][5].tolist() == [FALSE_POSITIVE]
+
+
+def test_compute_iou_ioa():
+    boxes1 = np.array([[0.0, 0.0, 0.5, 0.5]])
+    boxes2 = np.array([[0.0, 0.0, 1.0, 1.0], [0.0, 0.0, 0.5, 0.25]])
+
+    np.testing.assert_allclose(compute_iou(boxes1, boxes2), [[0.25, 0.5]])
+    np.testing.assert_allclose(compute_ioa(boxes1, boxes2), [[1.0, 0.5]])
+
+
+def test_compute_average_precision():
+    assert np.isnan(compute_average_precision(None, None))
+    assert compute_average_precision(np.zeros(0), np.zeros(0)) == 0.0
+
+    precision = np.array([1.0, 0.5, 2.0 / 3.0])
+    recall = np.array([0.5, 0.5, 1.0])
+    assert compute_average_precision(precision, recall) == pytest.approx(
+        0.5 + 0.5 * 2.0 / 3.0
+    )
+
+
+def test_match_trivial_image_without_predictions():
+    groundtruth = _make_groundtruth(
+        boxes=[
+            ("cat", 0.1, 0.5, 0.1, 0.5, 0),
+            ("cat", 0.5, 0.9, 0.5, 0.9, 1),
+            ("dog", 0.1, 0.5, 0.1, 0.5, 0),
+        ],
+        image_labels=[("bird", 1)],
+    )
+    parsed = parse_groundtruth(groundtruth, CLASS_LABEL_MAP)
+
+    (records,) = _match_trivial_image(
+        parsed, _make_predictions(), CLASS_LABEL_MAP, [0.5]
+    )
+
+    assert [(REVERSE_LABEL_MAP[r[0]], r[1]) for r in records] == [
+        ("cat", 2),
+        ("dog", 1),
+    ]
+    assert all(len(r[2]) == 0 and len(r[4]) == 0 for r in records)
+
+
+def test_match_trivial_image_without_located_groundtruth():
+    groundtruth = _make_groundtruth(image_labels=[("cat", 1), ("dog", 0)])
+    predictions = _make_predictions(
+        [
+            ("cat", 0.7, 0.1, 0.5, 0.1, 0.5),
+            ("dog", 0.8, 0.1, 0.5, 0.1, 0.5),
+            ("bird", 0.9, 0.1, 0.5, 0.1, 0.5),
+            ("cat", 0.9, 0.1, 0.5, 0.1, 0.5),
+        ]
+    )
+    parsed = parse_groundtruth(groundtruth, CLASS_LABEL_MAP)
+
+    (records,) = _match_trivial_image(
+        parsed, predictions, CLASS_LABEL_MAP, [0.5]
+    )
+
+    # the predictions of verified classes are false positives in decreasing
+    # score order, the unverified bird is ignored
+    by_class = {REVERSE_LABEL_MAP[r[0]]: r for r in records}
+    assert sorted(by_class) == ["cat", "dog"]
+    assert by_class["cat"][1] == 0
+    assert by_class["cat"][2].tolist() == [0.9, 0.7]
+    assert by_class["cat"][4].tolist() == [3, 0]
+    assert by_class["cat"][5].tolist() == [FALSE_POSITIVE] * 2
+    assert by_class["dog"][4].tolist() == [1]
+
+
+def test_evaluate_image(tmp_path):
+    labelmap_path = tmp_path / "label_map.pbtxt"
+    labelmap_path.write_text(
+        "".join(
+            'item { name: "%s" id: %d display_name: "%s" }\n'
+            % (name, _id, name)
+            for name, _id in CLASS_LABEL_MAP.items()
+        )
+    )
+    evaluator = NumpyObjectDetectionEvaluator(str(labelmap_path))
+
+    groundtruth = _make_groundtruth(
+        boxes=[("cat", 0.1, 0.5, 0.1, 0.5, 0), ("dog", 0.1, 0.5, 0.1, 0.5, 0)]
+    )
+    predictions = _make_predictions(
+        [("cat", 0.9, 0.1, 0.5, 0.1, 0.5), ("cat", 0.8, 0.1, 0.5, 0.1, 0.5)]
+    )
+
+    result = evaluator.evaluate_image("0", groundtruth, predictions)
+
+    assert result["true_positive_indexes"] == [0]
+    assert result["false_positive_indexes"] == [1]
+    assert result["AP_per_class"] == {"cat": 1.0, "dog": 0.0}
+    assert result["mAP"] == 0.5
+
+
+def test_compute_slice_stats_missing_values():
+    groundtruth = _make_groundtruth(
+        boxes=[
+            ("cat", 0.1, 0.5, 0.1, 0.5, 0),
+            ("cat", 0.5, 0.9, 0.5, 0.9, 0),
+        ],
+        image_labels=[("cat", 1)],
+    )
+    groundtruth["Source"] = ["xclick", None, "verification"]
+    groundtruth["IsOccluded"] = [1, np.nan, np.nan]
+    predictions = _make_predictions(
+        [
+            ("cat", 0.9, 0.1, 0.5, 0.1, 0.5),
+            ("cat", 0.8, 0.5, 0.9, 0.5, 0.9),
+            ("cat", 0.7, 0.0, 0.05, 0.0, 0.05),
+        ]
+    )
+
+    (records,) = _match(groundtruth, predictions)
+    slice_values = get_slice_values(
+        groundtruth, predictions, ["Source", "IsOccluded"]
+    )
+    slice_stats = compute_slice_stats(
+        records,
+        predictions,
+        parse_groundtruth(groundtruth, CLASS_LABEL_MAP),
+        slice_values,
+        REVERSE_LABEL_MAP,
+    )
+
+    # the ground truth with missing values and its true positive are in
+    # their own slice, the false positive is in every slice
+    for attribute, value in [("Source", "xclick"), ("IsOccluded", 1)]:
+        value_stats = slice_stats[attribute]
+        assert set(value_stats) == {value, MISSING_SLICE_VALUE, None}
+
+        for cur_value, num_gt, scores, labels in [
+            (value, 1, [0.9], [1.0]),
+            (MISSING_SLICE_VALUE, 1, [0.8], [1.0]),
+            (None, 0, [0.7], [0.0]),
+        ]:
+            cur_num_gt, cur_scores, cur_labels = value_stats[cur_value]["cat"]
+            assert cur_num_gt == num_gt
+            assert cur_scores.tolist() == scores
+            assert cur_labels.tolist() == labels
+
+
+def _make_class_stats(rng, num_images):
+    class_stats = []
+    for _ in range(num_images):
+        image_stats = {}
+        for class_name in rng.choice(["cat", "dog", "bird"], 2):
+            num_dets = rng.integers(0, 4)
+            image_stats[str(class_name)] = (
+                int(rng.integers(0, 3)),
+                rng.random(num_dets),
+                rng.integers(0, 2, num_dets).astype(float),
+            )
+
+        class_stats.append(image_stats)
+
+    return class_stats
+
+
+def test_accumulator_merge():
+    class_stats = _make_class_stats(np.random.default_rng(0), 50)
+
+    serial = DatasetMetricsAccumulator()
+    for image_stats in class_stats:
+        serial.add(image_stats)
+
+    merged = DatasetMetricsAccumulator()
+    for start in range(0, len(class_stats), 7):
+        shard = DatasetMetricsAccumulator()
+        for image_stats in class_stats[start : start + 7]:
+            shard.add(image_stats)
+
+        merged.merge(shard)
+
+    assert merged.compute_metrics() == serial.compute_metrics()
+    assert merged.compute_counts() == serial.compute_counts()
+
+    serial_curves = serial.compute_pr_curves()
+    merged_curves = merged.compute_pr_curves()
+    assert merged_curves.keys() == serial_curves.keys()
+    for class_name, curve in serial_curves.items():
+        for key, value in curve.items():
+            np.testing.assert_array_equal(
+                merged_curves[class_name][key], value
+            )
+
+
+def _compute_pr_curve(scores, labels, num_gt):
+    thresholds = sorted(set(scores), reverse=True)
+    precision = []
+    recall = []
+    for thresh in thresholds:
+        num_tp = sum(
+            label for score, label in zip(scores, labels) if score >= thresh
+        )
+        num_dets = sum(1 for score in scores if score >= thresh)
+        precision.append(num_tp / num_dets)
+        recall.append(num_tp / num_gt)
+
+    return thresholds, precision, recall
+
+
+def test_compute_pr_curves():
+    rng = np.random.default_rng(0)
+    class_stats = _make_class_stats(rng, 30)
+
+    # few distinct scores, so that there are many ties
+    for image_stats in class_stats:
+        for class_name, (num_gt, scores, labels) in image_stats.items():
+            image_stats[class_name] = (num_gt, np.round(scores, 1), labels)
+
+    # a class with predictions but no ground truth, and one with ground truth
+    # but no predictions
+    class_stats.append(
+        {
+            "fish": (0, np.array([0.9, 0.5]), np.zeros(2)),
+            "horse": (2, np.zeros(0), np.zeros(0)),
+        }
+    )
+
+    accumulator = DatasetMetricsAccumulator()
+    for image_stats in class_stats:
+        accumulator.add(image_stats)
+
+    curves = accumulator.compute_pr_curves()
+    ap_per_class = accumulator.compute_metrics()["AP_per_class"]
+    assert sorted(curves) == ["bird", "cat", "dog", "horse"]
+
+    for class_name, curve in curves.items():
+        num_gt = 0
+        scores = []
+        labels = []
+        for image_stats in class_stats:
+            if class_name in image_stats:
+                image_num_gt, image_scores, image_labels = image_stats[
+                    class_name
+                ]
+                num_gt += image_num_gt
+                scores.extend(image_scores)
+                labels.extend(image_labels)
+
+        thresholds, precision, recall = _compute_pr_curve(
+            scores, labels, num_gt
+        )
+        np.testing.assert_array_equal(curve["thresholds"], thresholds)
+        np.testing.assert_allclose(curve["precision"], precision)
+        np.testing.assert_allclose(curve["recall"], recall)
+        assert curve["AP"] == ap_per_class[class_name]
+
+        if not thresholds:
+            assert curve["best_threshold"] is None
+            assert curve["best_f1"] == 0
+            continue
+
+        f1 = [
+            2 * p * r / (p + r) if p + r > 0 else 0
+            for p, r in zip(precision, recall)
+        ]
+        best = int(np.argmax(f1))
+        assert curve["best_threshold"] == thresholds[best]
+        assert curve["best_precision"] == pytest.approx(precision[best])
+        assert curve["best_recall"] == pytest.approx(recall[best])
+        assert curve["best_f1"] == pytest.approx(f1[best])
@@ -0,0 +1,137 @@
+"""
+On-disk cache of parsed Open Images CSVs.
+
+Parsed tables are stored as Parquet files whose names are derived from the
+content hashes of the files they were parsed from, so a cached table is reused
+until one of its source files changes. Content hashes are themselves memoized
+by file size and modification time, so unchanged files are not re-hashed.
+
+**Note** reading and writing the cache requires a Parquet engine such as
+``pyarrow``, which can be installed with the ``parquet`` extra.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+import hashlib
+import importlib
+import json
+import os
+
+import pandas as pd
+
+
+# bump this when the parsed representation of the CSVs changes
+CACHE_VERSION = 3
+
+_HASHES_FILENAME = "hashes.json"
+_HASH_BLOCK_SIZE = 1 << 20
+_PARQUET_ENGINES = ["pyarrow", "fastparquet"]
+
+
+def get_file_hash(path, cache_dir=None):
+    """Returns the SHA-1 hash of the contents of the given file.
+
+    Args:
+        path: the path to the file
+        cache_dir: an optional cache directory in which to memoize the hash
+            by file size and modification time
+
+    Returns:
+        the hex digest
+    """
+    if cache_dir is None:
+        return _compute_file_hash(path)
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = [stat.st_size, stat.st_mtime_ns]
+
+    hashes = _read_hashes(cache_dir)
+    entry = hashes.get(path, None)
+    if entry is not None and entry[:2] == key:
+        return entry[2]
+
+    file_hash = _compute_file_hash(path)
+    hashes[path] = key + [file_hash]
+    _write_hashes(cache_dir, hashes)
+
+    return file_hash
+
+
+def read_cached(parse_fcn, paths, cache_dir):
+    """Returns the DataFrame parsed from the given files, reading it from the
+    cache if the files have been parsed before.
+
+    Args:
+        parse_fcn: a function that parses ``paths`` into a pandas.DataFrame
+        paths: the list of files that ``parse_fcn`` reads. None entries are
+            allowed and are hashed as such
+        cache_dir: the cache directory
+
+    Returns:
+        a pandas.DataFrame
+    """
+    # fail before parsing rather than when writing the parsed table
+    _check_parquet_engine()
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = hashlib.sha1(str(CACHE_VERSION).encode())
+    for path in paths:
+        file_hash = get_file_hash(path, cache_dir) if path else "none"
+        key.update(file_hash.encode())
+
+    cache_path = os.path.join(cache_dir, key.hexdigest() + ".parquet")
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+
+    df = parse_fcn(*paths)
+
+    # write atomically so that interrupted runs never leave partial tables
+    tmp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+    return df
+
+
+def _check_parquet_engine():
+    for engine in _PARQUET_ENGINES:
+        try:
+            importlib.import_module(engine)
+            return
+        except ImportError:
+            pass
+
+    raise ImportError(
+        "Caching parsed CSVs requires a Parquet engine such as pyarrow, which"
+        " can be installed via `pip install pyarrow`"
+    )
+
+
+def _compute_file_hash(path):
+    file_hash = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def _read_hashes(cache_dir):
+    hashes_path = os.path.join(cache_dir, _HASHES_FILENAME)
+    if not os.path.exists(hashes_path):
+        return {}
+
+    with open(hashes_path, "r") as f:
+        return json.load(f)
+
+
+def _write_hashes(cache_dir, hashes):
+    os.makedirs(cache_dir, exist_ok=True)
+    hashes_path = os.path.join(cache_dir, _HASHES_FILENAME)
+    tmp_path = "%s.%d.tmp" % (hashes_path, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(hashes, f)
+
+    os.replace(tmp_path, hashes_path)
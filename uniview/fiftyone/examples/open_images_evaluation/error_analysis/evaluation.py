@@ -2,35 +2,55 @@
 Utilities for computing per-image evaluations on a FiftyOne dataset using the
 Tensorflow Object Detection API.
 
-**Note** importing this module requires an environment variable
+**Note** the ``"tensorflow"`` backend requires an environment variable
 `TF_MODELS_RESEARCH` that specifies the path to the
 tensorflow [models/research directory](https://github.com/tensorflow/models/tree/master/research).  # noqa: E501, B950
+The Tensorflow Object Detection API is only imported when this backend is
+used, so importing this module or using the ``"numpy"`` backend does not
+require it.
 
 Copyright 2017-2021, Voxel51, Inc.
 voxel51.com
 """
+from collections import Counter
+import hashlib
+import itertools
+import json
 import os
 import sys
+import warnings
 
-from google.protobuf import text_format
 import numpy as np
 import pandas as pd
 
+import fiftyone.core.dataset as fod
+import fiftyone.core.labels as fol
 import fiftyone.core.utils as fou
+import fiftyone.core.view as fov
 
-from .load_data import detections2df, classifications2df
+from .cache import get_file_hash
+from .labelmap import load_labelmap
+from .load_data import OPEN_IMAGES_ID, detections2df, classifications2df
+from .numpy_evaluation import (
+    SLICE_ATTRIBUTES,
+    DatasetMetricsAccumulator,
+    NumpyObjectDetectionEvaluator,
+    SlicedMetricsAccumulator,
+    compute_slice_stats,
+    get_iou_thresholds,
+    get_slice_values,
+    get_threshold_suffix,
+    get_TP_FP_indexes,
+    is_trivial_image,
+    make_image_result,
+    match_image,
+    parse_groundtruth,
+)
+from .parallel import iter_map
 
-TF_MODELS_RESEARCH = os.getenv("TF_MODELS_RESEARCH")
-if not TF_MODELS_RESEARCH:
-    raise OSError(
-        "This module requires an environment variable TF_MODELS_RESEARCH that"
-        " points to the .../models/research directory"
-    )
-sys.path.insert(0, TF_MODELS_RESEARCH)
 
-from object_detection.metrics import oid_challenge_evaluation_utils as utils
-from object_detection.protos import string_int_label_map_pb2
-from object_detection.utils import object_detection_evaluation
+FINGERPRINT_FIELD = "eval_fingerprint"
+CLASS_STATS_FIELD = "eval_class_stats"
 
 
 class TensorflowObjectDetectionAPIEvaluator:
@@ -39,12 +59,24 @@ class TensorflowObjectDetectionAPIEvaluator:
     that supports per-image evaluation and finds the true/false positive boxes.
     """
 
-    def __init__(self, class_label_map_path, iou_threshold=0.5):
+    def __init__(self, class_label_map_path, iou_threshold=0.5, slices=None):
         """
         Args:
             class_label_map_path: path to the label map .pbtxt file
+            iou_threshold: an IoU threshold or a list of IoU thresholds, in
+                which case an image is evaluated by one Open Images Challenge
+                evaluator per threshold, each of which recomputes the IoUs.
+                Only the NumPy backend computes them once for all thresholds
+            slices: an optional list of ground truth attributes by which to
+                slice the results, see
+                :func:`error_analysis.numpy_evaluation.compute_slice_stats`
         """
+        utils, object_detection_evaluation = _import_tf_object_detection()
+        self._utils = utils
+
         self._iou_threshold = iou_threshold
+        self._iou_thresholds = get_iou_thresholds(iou_threshold)
+        self._slices = slices
 
         self._class_label_map, self._categories = self.load_labelmap(
             class_label_map_path
@@ -53,13 +85,18 @@ class TensorflowObjectDetectionAPIEvaluator:
             v: k for k, v in self._class_label_map.items()
         }
 
-        self._evaluator = (
+        self._evaluators = [
             object_detection_evaluation.OpenImagesChallengeEvaluator(
                 self._categories,
                 evaluate_masks=False,
-                matching_iou_threshold=self._iou_threshold,
+                matching_iou_threshold=iou_threshold,
             )
-        )
+            for iou_threshold in self._iou_thresholds
+        ]
+
+        # the numbers of evaluated images and of images without predictions
+        # or located ground truth, which skip the Tensorflow evaluators
+        self.counts = Counter()
 
     def evaluate_image(self, image_id, groundtruth, predictions):
         """Evaluates a single image.
@@ -84,86 +121,191 @@ class TensorflowObjectDetectionAPIEvaluator:
                         "<LabelName>": <AP>,
                         "<LabelName>": <AP>,
                         ...
+                    },
+                    "class_stats": {
+                        "<LabelName>": (<num_gt>, <scores>, <tp_fp_labels>),
+                        ...
                     }
                 }
+
+            If the evaluator has slices, the dictionary also contains the
+            "slice_stats" of the image.
+
+            If the evaluator has a list of IoU thresholds, a list with one
+            such dictionary per threshold is returned
         """
-        # add data to evaluator
-        groundtruth_dict = utils.build_groundtruth_dictionary(
+        parsed_groundtruth = parse_groundtruth(
             groundtruth, self._class_label_map
         )
-        prediction_dict = utils.build_predictions_dictionary(
-            predictions, self._class_label_map
+        records = match_image(
+            groundtruth,
+            predictions,
+            self._class_label_map,
+            self._iou_thresholds,
+            parsed_groundtruth=parsed_groundtruth,
         )
-        self._evaluator.add_single_ground_truth_image_info(
-            image_id, groundtruth_dict
+
+        self.counts["images"] += 1
+        if is_trivial_image(parsed_groundtruth, predictions):
+            # nothing to match, so the results follow directly from the
+            # ground truth and predictions
+            self.counts["fast_path_images"] += 1
+            results = [
+                make_image_result(
+                    thresh_records, predictions, self._reverse_label_map
+                )
+                for thresh_records in records
+            ]
+        else:
+            results = self._evaluate_nontrivial_image(
+                image_id, groundtruth, predictions, records
+            )
+
+        if self._slices:
+            slice_values = get_slice_values(
+                groundtruth, predictions, self._slices
+            )
+            for result, thresh_records in zip(results, records):
+                result["slice_stats"] = compute_slice_stats(
+                    thresh_records,
+                    predictions,
+                    parsed_groundtruth,
+                    slice_values,
+                    self._reverse_label_map,
+                )
+
+        if np.isscalar(self._iou_threshold):
+            return results[0]
+
+        return results
+
+    def _evaluate_nontrivial_image(
+        self, image_id, groundtruth, predictions, records
+    ):
+        # add data to evaluators
+        groundtruth_dict = self._utils.build_groundtruth_dictionary(
+            groundtruth, self._class_label_map
         )
-        self._evaluator.add_single_detected_image_info(
-            image_id, prediction_dict
+        prediction_dict = self._utils.build_predictions_dictionary(
+            predictions, self._class_label_map
         )
+        for evaluator in self._evaluators:
+            evaluator.add_single_ground_truth_image_info(
+                image_id, groundtruth_dict
+            )
+            evaluator.add_single_detected_image_info(image_id, prediction_dict)
 
-        # guarantee the evaluator is cleared
+        # guarantee the evaluators are cleared
         try:
             # actually evaluate the image
-            result = self._evaluate_image(predictions)
+            results = self._evaluate_image(image_id, records, predictions)
         finally:
-            self._evaluator.clear()
+            for evaluator in self._evaluators:
+                evaluator.clear()
 
-        return result
+        return results
 
-    def _evaluate_image(self, predictions):
-        state, _ = self._evaluator.get_internal_state()
-        tp_idxs, fp_idxs = self._get_TP_FP(state, predictions)
+    def _evaluate_image(self, image_id, records, predictions):
+        TP_FP_idxs = self._get_TP_FP(records, predictions)
 
-        eval_result = self._evaluator.evaluate()
+        results = []
+        for evaluator, thresh_records, (tp_idxs, fp_idxs) in zip(
+            self._evaluators, records, TP_FP_idxs
+        ):
+            state, _ = evaluator.get_internal_state()
+            class_stats = self._get_class_stats(state)
+            self._check_class_stats(image_id, thresh_records, class_stats)
 
-        return {
-            "true_positive_indexes": tp_idxs,
-            "false_positive_indexes": fp_idxs,
-            "mAP": self._get_mAP(eval_result),
-            "AP_per_class": self._get_AP_per_class(eval_result),
-        }
+            eval_result = evaluator.evaluate()
 
-    def _get_TP_FP(self, state, predictions):
-        """Finds the true positive and false positive bounding boxes.
+            results.append(
+                {
+                    "true_positive_indexes": tp_idxs,
+                    "false_positive_indexes": fp_idxs,
+                    "mAP": self._get_mAP(eval_result),
+                    "AP_per_class": self._get_AP_per_class(eval_result),
+                    "class_stats": class_stats,
+                }
+            )
 
-        Returns:
-              true_positive_idxs, false_positive_idxs: each of which is a list
-                of row indexes for prediction rows with true positives and
-                false positives respectively.
-                To be accessed via:
-                    predictions.loc[true_positive_idxs]
+        return results
+
+    def _get_class_stats(self, state):
+        """Extracts the per-class ground truth counts, scores and true
+        positive labels of the evaluated image from the evaluator state, so
+        that they can be accumulated across images.
         """
-        true_positive_idxs = []
-        false_positive_idxs = []
+        class_stats = {}
 
         for class_label in range(1, len(state.scores_per_class) + 1):
+            num_gt = int(state.num_gt_instances_per_class[class_label - 1])
             cur_scores = state.scores_per_class[class_label - 1]
-            if not cur_scores:
+            if not cur_scores and num_gt == 0:
                 continue
 
-            for i, score in enumerate(cur_scores[0]):
-                class_name = self._reverse_label_map[class_label]
+            cur_labels = state.tp_fp_labels_per_class[class_label - 1]
+            class_stats[self._reverse_label_map[class_label]] = (
+                num_gt,
+                np.concatenate(cur_scores) if cur_scores else np.zeros(0),
+                np.concatenate(cur_labels) if cur_labels else np.zeros(0),
+            )
 
-                match_idxs = predictions[
-                    (predictions.Score == score)
-                    & (predictions.LabelName == class_name)
-                ].index
+        return class_stats
 
-                if len(match_idxs) == 1:
-                    is_tp = bool(
-                        state.tp_fp_labels_per_class[class_label - 1][0][i]
-                    )
-                    if is_tp:
-                        true_positive_idxs.append(match_idxs[0])
-                    else:
-                        false_positive_idxs.append(match_idxs[0])
-                else:
-                    # @todo(Tyler) this is an unaccounted-for match. It is
-                    #   unclear what box it refers to because multiple boxes
-                    #   have the same class label and score
-                    pass
-
-        return true_positive_idxs, false_positive_idxs
+    def _check_class_stats(self, image_id, records, class_stats):
+        """Warns if the true positive labels of :func:`match_image`, from
+        which the true/false positive boxes are found, differ from those of
+        the evaluator, from which the metrics are computed, e.g. because the
+        evaluator only keeps the 10000 highest scoring boxes of a class.
+        """
+        matched_classes = set()
+        for class_id, _, pr_scores, pr_labels, _, _, _ in records:
+            class_name = self._reverse_label_map[class_id]
+            matched_classes.add(class_name)
+
+            _, scores, tp_fp_labels = class_stats.get(
+                class_name, (0, np.zeros(0), np.zeros(0))
+            )
+            if not _is_same_pr(pr_scores, pr_labels, scores, tp_fp_labels):
+                self._warn_class_stats_mismatch(image_id, class_name)
+
+        for class_name, (_, scores, _) in class_stats.items():
+            if class_name not in matched_classes and len(scores) > 0:
+                self._warn_class_stats_mismatch(image_id, class_name)
+
+    def _warn_class_stats_mismatch(self, image_id, class_name):
+        warnings.warn(
+            "The true/false positive boxes of class '%s' in image '%s' do not"
+            " match the Tensorflow evaluator, so they are inconsistent with"
+            " the computed metrics" % (class_name, image_id)
+        )
+
+    def _get_TP_FP(self, records, predictions):
+        """Finds the true positive and false positive bounding boxes.
+
+        The evaluator's internal state only holds the scores and true
+        positive labels of each class, so the verdicts are taken from the
+        records of :func:`match_image`, which matches the predictions with
+        the same rules and ordering as the evaluator. This gives an exact
+        verdict for every prediction, even when several predictions of a
+        class have the same score.
+
+        Args:
+            records: the records generated by :func:`match_image`
+            predictions: the predictions pandas.DataFrame of the image
+
+        Returns:
+              a list with, for each IoU threshold, a tuple of
+              true_positive_idxs, false_positive_idxs: each of which is a list
+                of row indexes for prediction rows with true positives and
+                false positives respectively.
+                To be accessed via:
+                    predictions.loc[true_positive_idxs]
+        """
+        return [
+            get_TP_FP_indexes(thresh_records, predictions)
+            for thresh_records in records
+        ]
 
     def _get_mAP(self, eval_result):
         keys = [key for key in eval_result if "mAP" in key]
@@ -183,6 +325,9 @@ class TensorflowObjectDetectionAPIEvaluator:
     def load_labelmap(labelmap_path):
         """Loads labelmap from the labelmap path.
 
+        The label map is parsed like protobuf parses it, and is memoized per
+        process, see :func:`error_analysis.labelmap.load_labelmap`.
+
         Args:
             labelmap_path: Path to the labelmap.
 
@@ -190,23 +335,45 @@ class TensorflowObjectDetectionAPIEvaluator:
             A dictionary mapping class name to class numerical id
             A list with dictionaries, one dictionary per category.
         """
-        # pylint: disable=no-member
-        label_map = string_int_label_map_pb2.StringIntLabelMap()
-        with open(labelmap_path, "r") as fid:
-            label_map_string = fid.read()
-            text_format.Merge(label_map_string, label_map)
-        labelmap_dict = {}
-        categories = []
-        for item in label_map.item:
-            labelmap_dict[item.name] = item.id
-            categories.append(
-                {
-                    "id": item.id,
-                    "name": item.name,
-                    "display_name": item.display_name,
-                }
-            )
-        return labelmap_dict, categories
+        return load_labelmap(labelmap_path)
+
+
+def _is_same_pr(scores1, labels1, scores2, labels2):
+    # the same (score, label) pairs, regardless of the order of ties
+    if len(scores1) != len(scores2):
+        return False
+
+    order1 = np.lexsort((labels1, scores1))
+    order2 = np.lexsort((labels2, scores2))
+    return np.array_equal(
+        np.asarray(scores1, dtype=float)[order1],
+        np.asarray(scores2, dtype=float)[order2],
+    ) and np.array_equal(
+        np.asarray(labels1, dtype=float)[order1],
+        np.asarray(labels2, dtype=float)[order2],
+    )
+
+
+def _import_tf_object_detection():
+    _add_tf_models_research_to_path()
+
+    from object_detection.metrics import oid_challenge_evaluation_utils
+    from object_detection.utils import object_detection_evaluation
+
+    return oid_challenge_evaluation_utils, object_detection_evaluation
+
+
+def _add_tf_models_research_to_path():
+    tf_models_research = os.getenv("TF_MODELS_RESEARCH")
+    if not tf_models_research:
+        raise OSError(
+            "The tensorflow backend requires an environment variable"
+            " TF_MODELS_RESEARCH that points to the .../models/research"
+            " directory"
+        )
+
+    if tf_models_research not in sys.path:
+        sys.path.insert(0, tf_models_research)
 
 
 def evaluate_dataset(
@@ -216,80 +383,725 @@ def evaluate_dataset(
     groundtruth_img_labels_field_name="groundtruth_image_labels",
     prediction_field_name="predicted_detections",
     iou_threshold=0.5,
+    backend="tensorflow",
+    num_workers=None,
+    shard_size=1000,
+    batch_size=1000,
+    incremental=False,
+    pr_curves=False,
+    cache_dir=None,
+    split_predictions=False,
+    slices=None,
 ):
     """Evaluates a FiftyOne dataset that contains all necessary fields for
     evaluation via Tensorflow Object Detection API on a per-image granularity.
 
+    The per-sample results are written back to the samples, and the
+    dataset-level metrics are accumulated in the same pass. When several
+    prediction fields or IoU thresholds are evaluated, the per-sample results
+    are stored in fields prefixed by the prediction field name and suffixed
+    by the threshold in percent, e.g. ``predicted_detections_mAP_50``.
+
     Args:
-        dataset: the :class:`fiftyone.core.dataset.Dataset` to evaluate
+        dataset: the :class:`fiftyone.core.dataset.Dataset` or
+            :class:`fiftyone.core.view.DatasetView` to evaluate
         label_map_path: path to the label map .pbtxt file
         groundtruth_loc_field_name: the name of the groundtruth
             :class:`fiftyone.core.labels.Detections` field
         groundtruth_img_labels_field_name: the name of the groundtruth
             :class:`fiftyone.core.labels.Classifications` field
         prediction_field_name: the name of the predicted
-            :class:`fiftyone.core.labels.Detections` field
+            :class:`fiftyone.core.labels.Detections` field, or a list of
+            such fields
         iou_threshold: the intersection-over-union bounding box matching
-            threshold
+            threshold, or a list of thresholds. Only the ``"numpy"`` backend
+            computes the IoUs of an image once for all thresholds
+        backend: the name of the evaluation backend to use, see
+            :func:`get_backend_names`. The built-in backends are
+            ``"tensorflow"`` and the faster ``"numpy"``
+        num_workers: an optional number of worker processes to use
+        shard_size: the number of samples per worker task
+        batch_size: the number of samples whose results are written to the
+            database at a time
+        incremental: whether to only re-evaluate the samples whose inputs
+            changed since the last incremental evaluation
+        pr_curves: whether to also compute the precision-recall curves, see
+            :meth:`DatasetMetricsAccumulator.compute_pr_curves`
+        cache_dir: an optional directory in which to cache the compiled label
+            map
+        split_predictions: whether to also write the true and false positive
+            predictions to fields suffixed by ``_TP`` and ``_FP``
+        slices: an optional list of
+            :const:`error_analysis.numpy_evaluation.SLICE_ATTRIBUTES` by which
+            to slice the dataset-level metrics, see
+            :func:`error_analysis.numpy_evaluation.compute_slice_stats`. Not
+            supported in incremental mode
+
+    Returns:
+        a dictionary with the dataset-level "mAP" and "AP_per_class", and the
+        optional "PR_curves" and "slices" metrics, keyed by display name. If
+        lists of IoU thresholds or prediction fields are provided, nested
+        dictionaries keyed by threshold and by field
     """
-    _, categories = TensorflowObjectDetectionAPIEvaluator.load_labelmap(
-        label_map_path
-    )
-    display2name_map = {d["display_name"]: d["name"] for d in categories}
+    # fails early on unknown backends
+    get_backend(backend)
+
+    _, categories = load_labelmap(label_map_path, cache_dir=cache_dir)
     name2display_map = {d["name"]: d["display_name"] for d in categories}
 
-    evaluator = TensorflowObjectDetectionAPIEvaluator(
-        label_map_path, iou_threshold=iou_threshold
+    eval_kwargs = {
+        "label_map_path": label_map_path,
+        "cache_dir": cache_dir,
+        "groundtruth_loc_field_name": groundtruth_loc_field_name,
+        "groundtruth_img_labels_field_name": groundtruth_img_labels_field_name,
+        "prediction_field_name": prediction_field_name,
+        "iou_threshold": iou_threshold,
+        "backend": backend,
+        "split_predictions": split_predictions,
+        "slices": slices,
+    }
+
+    iou_thresholds = get_iou_thresholds(iou_threshold)
+    suffixes = {get_threshold_suffix(t) for t in iou_thresholds}
+    if len(suffixes) < len(iou_thresholds):
+        raise ValueError(
+            "IoU thresholds must be distinct when rounded to two decimals"
+        )
+
+    prediction_field_names = _get_prediction_field_names(prediction_field_name)
+    if not prediction_field_names:
+        raise ValueError("At least one prediction field must be provided")
+
+    if len(set(prediction_field_names)) < len(prediction_field_names):
+        raise ValueError("Prediction fields must be distinct")
+
+    if slices:
+        _validate_slices(slices, incremental)
+
+    # one accumulator per prediction field and IoU threshold, in this order
+    evaluations = list(
+        itertools.product(prediction_field_names, iou_thresholds)
     )
 
-    with fou.ProgressBar(dataset) as pb:
-        for sample in pb(dataset):
-            # convert groundtruth to dataframe
-            loc_annos = detections2df(
-                sample.open_images_id,
-                sample[groundtruth_loc_field_name],
-                display2name_map=display2name_map,
-                is_groundtruth=True,
-            )
-            label_annos = classifications2df(
-                sample.open_images_id,
-                sample[groundtruth_img_labels_field_name],
-                display2name_map=display2name_map,
-            )
-            groundtruth = pd.concat([loc_annos, label_annos])
+    if incremental:
+        fingerprints = _compute_fingerprints(dataset, eval_kwargs)
+        samples = _select_changed_samples(dataset, fingerprints)
+        print(
+            "Re-evaluating %d of %d samples whose inputs changed"
+            % (len(samples), len(fingerprints))
+        )
+    else:
+        samples = dataset
 
-            # convert predictions to dataframe
-            predictions = detections2df(
-                sample.open_images_id,
-                sample[prediction_field_name],
-                display2name_map=display2name_map,
-            )
+    accumulators = _make_accumulators(len(evaluations), slices)
+    counts = Counter()
 
-            # evaluate
-            result = evaluator.evaluate_image(
-                sample.open_images_id, groundtruth, predictions
-            )
+    if num_workers:
+        results = _iter_results_parallel(
+            dataset,
+            samples,
+            eval_kwargs,
+            accumulators,
+            counts,
+            num_workers,
+            shard_size,
+            incremental,
+        )
+    else:
+        sample_evaluator = _SampleEvaluator(
+            store_class_stats=incremental, **eval_kwargs
+        )
+        results = _iter_results(
+            samples.select_fields(sample_evaluator.field_names),
+            sample_evaluator,
+            accumulators,
+            counts,
+        )
+
+    writer = _SampleValuesWriter(samples, batch_size)
+    with fou.ProgressBar(samples) as pb:
+        for sample_id, values in pb(results):
+            if incremental:
+                values[FINGERPRINT_FIELD] = fingerprints[sample_id]
 
-            # store mAP
-            mAP = result["mAP"]
-            if not np.isnan(mAP):
-                sample["mAP"] = mAP
+            writer.add(sample_id, values)
+
+    writer.flush()
+
+    print(
+        "%d of %d image evaluations had no predictions or no located ground"
+        " truth and took the fast path"
+        % (counts["fast_path_images"], counts["images"])
+    )
 
-            # store AP per class
-            sample["AP_per_class"] = {
+    if incremental:
+        # the dataset-level metrics also cover the unchanged samples, so they
+        # are accumulated from the stored per-sample stats
+        accumulators = _accumulate_stored_class_stats(
+            dataset, len(evaluations)
+        )
+
+    all_metrics = {}
+    for idx, (field_name, thresh) in enumerate(evaluations):
+        accumulator = accumulators[idx]
+        metrics = accumulator.compute_metrics()
+        field_metrics = all_metrics.setdefault(field_name, {})
+        field_metrics[thresh] = {
+            "mAP": metrics["mAP"],
+            "AP_per_class": {
+                name2display_map[k]: v
+                for k, v in metrics["AP_per_class"].items()
+            },
+        }
+
+        if pr_curves:
+            field_metrics[thresh]["PR_curves"] = {
                 name2display_map[k]: v
-                for k, v in result["AP_per_class"].items()
-                if not np.isnan(v)
+                for k, v in accumulator.compute_pr_curves().items()
             }
 
-            # store false positives
-            for idx in result["false_positive_indexes"]:
-                det = sample[prediction_field_name].detections[idx]
-                det["eval"] = "false_positive"
+        if slices:
+            # the slice accumulators follow the per-class ones
+            slice_accumulator = accumulators[len(evaluations) + idx]
+            slice_metrics = slice_accumulator.compute_metrics()
+            for value_metrics in slice_metrics.values():
+                for metrics in value_metrics.values():
+                    metrics["AP_per_class"] = {
+                        name2display_map[k]: v
+                        for k, v in metrics["AP_per_class"].items()
+                    }
+
+            field_metrics[thresh]["slices"] = slice_metrics
+
+    if np.isscalar(iou_threshold):
+        all_metrics = {k: v[iou_threshold] for k, v in all_metrics.items()}
+
+    if isinstance(prediction_field_name, str):
+        return all_metrics[prediction_field_name]
+
+    return all_metrics
+
+
+_BACKENDS = {}
+
+
+def register_backend(name, evaluator_cls):
+    """Registers an evaluation backend that can be passed to
+    :func:`evaluate_dataset`.
+
+    Backends are registered per process, so backends used with workers must
+    be registered when this module is imported in the workers too, e.g. by
+    registering them in the module that defines them.
+
+    Args:
+        name: the name of the backend
+        evaluator_cls: the evaluator class, which must have the constructor
+            and ``evaluate_image()`` interface of
+            :class:`NumpyObjectDetectionEvaluator`
+    """
+    _BACKENDS[name] = evaluator_cls
+
+
+def get_backend(name):
+    """Returns the evaluator class of a registered evaluation backend.
+
+    Args:
+        name: the name of the backend
+
+    Returns:
+        the evaluator class
+    """
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            "Unsupported backend '%s'. The available backends are %s"
+            % (name, get_backend_names())
+        )
+
+
+def get_backend_names():
+    """Returns the names of the registered evaluation backends.
+
+    Returns:
+        a sorted list of backend names
+    """
+    return sorted(_BACKENDS)
 
-            # store true positives
-            for idx in result["true_positive_indexes"]:
-                det = sample[prediction_field_name].detections[idx]
-                det["eval"] = "true_positive"
 
-            sample.save()
+register_backend("tensorflow", TensorflowObjectDetectionAPIEvaluator)
+register_backend("numpy", NumpyObjectDetectionEvaluator)
+
+
+def _validate_slices(slices, incremental):
+    unsupported = sorted(set(slices) - set(SLICE_ATTRIBUTES))
+    if unsupported:
+        raise ValueError(
+            "Unsupported slices %s. The supported slices are %s"
+            % (unsupported, SLICE_ATTRIBUTES)
+        )
+
+    if incremental:
+        raise ValueError("Slices are not supported in incremental mode")
+
+
+def _make_accumulators(num_evaluations, slices):
+    accumulators = [
+        DatasetMetricsAccumulator() for _ in range(num_evaluations)
+    ]
+    if slices:
+        accumulators.extend(
+            SlicedMetricsAccumulator() for _ in range(num_evaluations)
+        )
+
+    return accumulators
+
+
+class _SampleEvaluator:
+    """Converts the label fields of samples to dataframes, evaluates them and
+    converts the results to the values of the fields to write back.
+
+    Only the Open Images ID, ground truth and prediction fields of the
+    samples need to be loaded. The ground truth of a sample is converted
+    once and evaluated against all prediction fields, at all IoU thresholds
+    at once. The per-sample metrics of several prediction fields are stored
+    in fields prefixed by their names, and those of several thresholds in
+    fields suffixed by the threshold in percent, e.g. ``mAP_50`` and the
+    ``eval_50`` attribute of the predictions for a threshold of 0.5.
+    """
+
+    def __init__(
+        self,
+        label_map_path,
+        groundtruth_loc_field_name,
+        groundtruth_img_labels_field_name,
+        prediction_field_name,
+        iou_threshold,
+        backend,
+        cache_dir=None,
+        split_predictions=False,
+        slices=None,
+        store_class_stats=False,
+    ):
+        # this also compiles the label map for the evaluator, which loads it
+        # from the per-process memo
+        _, categories = load_labelmap(label_map_path, cache_dir=cache_dir)
+        self._display2name_map = {
+            d["display_name"]: d["name"] for d in categories
+        }
+        self._name2display_map = {
+            d["name"]: d["display_name"] for d in categories
+        }
+        self._groundtruth_loc_field_name = groundtruth_loc_field_name
+        self._groundtruth_img_labels_field_name = (
+            groundtruth_img_labels_field_name
+        )
+        self._prediction_field_names = _get_prediction_field_names(
+            prediction_field_name
+        )
+        self._split_predictions = split_predictions
+        self._slices = slices
+        self._store_class_stats = store_class_stats
+
+        # the per-sample metrics of several prediction fields are stored in
+        # fields prefixed by their names
+        if isinstance(prediction_field_name, str):
+            self._field_prefixes = [""]
+        else:
+            self._field_prefixes = [
+                name + "_" for name in self._prediction_field_names
+            ]
+
+        # the only fields that need to be loaded to evaluate a sample
+        self.field_names = [
+            OPEN_IMAGES_ID,
+            groundtruth_loc_field_name,
+            groundtruth_img_labels_field_name,
+        ] + self._prediction_field_names
+
+        if np.isscalar(iou_threshold):
+            self._field_suffixes = [""]
+        else:
+            self._field_suffixes = [
+                get_threshold_suffix(t) for t in iou_threshold
+            ]
+
+        # only passed when needed, so that backends without slicing support
+        # can be used without slices
+        backend_kwargs = {"slices": slices} if slices else {}
+        self._evaluator = get_backend(backend)(
+            label_map_path, iou_threshold=iou_threshold, **backend_kwargs
+        )
+
+        self._num_evaluations = len(self._prediction_field_names) * len(
+            self._field_suffixes
+        )
+
+    def evaluate(self, sample):
+        """Evaluates a sample.
+
+        Returns:
+            a tuple of a dict mapping field names to the values to write to
+            the sample, and a list of the "class_stats" of the evaluation
+            results of each prediction field at each IoU threshold, followed
+            by their "slice_stats" if the results are sliced
+        """
+        # convert groundtruth to dataframe
+        loc_annos = detections2df(
+            sample.open_images_id,
+            sample[self._groundtruth_loc_field_name],
+            display2name_map=self._display2name_map,
+            is_groundtruth=True,
+        )
+        label_annos = classifications2df(
+            sample.open_images_id,
+            sample[self._groundtruth_img_labels_field_name],
+            display2name_map=self._display2name_map,
+        )
+        groundtruth = pd.concat([loc_annos, label_annos])
+
+        values = {}
+        class_stats = []
+        slice_stats = []
+        for prediction_field_name, prefix in zip(
+            self._prediction_field_names, self._field_prefixes
+        ):
+            detections = sample[prediction_field_name]
+            results = self._evaluate_predictions(
+                sample.open_images_id, groundtruth, detections
+            )
+
+            field_evals = []
+            for suffix, result in zip(self._field_suffixes, results):
+                # mAP
+                mAP = result["mAP"]
+                values[prefix + "mAP" + suffix] = (
+                    None if np.isnan(mAP) else mAP
+                )
+
+                # AP per class
+                values[prefix + "AP_per_class" + suffix] = {
+                    self._name2display_map[k]: v
+                    for k, v in result["AP_per_class"].items()
+                    if not np.isnan(v)
+                }
+
+                # true and false positives
+                if detections is not None:
+                    evals = [None] * len(detections.detections)
+                    for idx in result["false_positive_indexes"]:
+                        evals[idx] = "false_positive"
+
+                    for idx in result["true_positive_indexes"]:
+                        evals[idx] = "true_positive"
+
+                    field_name = prediction_field_name + ".detections.eval"
+                    values[field_name + suffix] = evals
+                    field_evals.append((suffix, evals))
+
+                class_stats.append(result["class_stats"])
+                if self._slices:
+                    slice_stats.append(result["slice_stats"])
+
+            if self._split_predictions and detections is not None:
+                values.update(
+                    _split_detections(
+                        prediction_field_name, detections, field_evals
+                    )
+                )
+
+        if self._store_class_stats:
+            values[CLASS_STATS_FIELD] = _serialize_class_stats(class_stats)
+
+        return values, class_stats + slice_stats
+
+    def make_accumulators(self):
+        """Returns empty accumulators for the stats returned by
+        :meth:`evaluate`.
+        """
+        return _make_accumulators(self._num_evaluations, self._slices)
+
+    @property
+    def counts(self):
+        """The numbers of evaluated images and of images that took the fast
+        path of the evaluator, if it counts them.
+        """
+        return getattr(self._evaluator, "counts", Counter())
+
+    def _evaluate_predictions(self, image_id, groundtruth, detections):
+        # convert predictions to dataframe
+        predictions = detections2df(
+            image_id, detections, display2name_map=self._display2name_map
+        )
+
+        # evaluate
+        results = self._evaluator.evaluate_image(
+            image_id, groundtruth, predictions
+        )
+        if len(self._field_suffixes) == 1:
+            results = [results]
+
+        return results
+
+
+def _split_detections(prediction_field_name, detections, field_evals):
+    # the true and false positives are split in the same pass rather than by
+    # filtering and cloning the prediction field afterwards. They are copies
+    # of the predictions with the eval attributes that are written back, like
+    # clones of the field after the write-back would have
+    dets = [det.copy() for det in detections.detections]
+    for suffix, evals in field_evals:
+        for det, value in zip(dets, evals):
+            det["eval" + suffix] = value
+
+    values = {}
+    for suffix, evals in field_evals:
+        for field_suffix, verdict in (
+            ("_TP", "true_positive"),
+            ("_FP", "false_positive"),
+        ):
+            matches = [
+                det for det, value in zip(dets, evals) if value == verdict
+            ]
+            field_name = prediction_field_name + field_suffix + suffix
+            values[field_name] = (
+                fol.Detections(detections=matches) if matches else None
+            )
+
+    return values
+
+
+class _SampleValuesWriter:
+    """Buffers per-sample field values and writes them to a sample collection
+    with one bulk update per field every ``batch_size`` samples, rather than
+    by saving each sample.
+    """
+
+    def __init__(self, sample_collection, batch_size):
+        self._sample_collection = sample_collection
+        self._batch_size = batch_size
+        self._buffer = []
+
+    def add(self, sample_id, values):
+        self._buffer.append((sample_id, values))
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        field_values = {}
+        for sample_id, values in self._buffer:
+            for field_name, value in values.items():
+                ids, vals = field_values.setdefault(field_name, ([], []))
+                ids.append(sample_id)
+                vals.append(value)
+
+        # samples are buffered in collection order, which selecting them
+        # from the collection preserves
+        for field_name, (ids, vals) in field_values.items():
+            self._sample_collection.select(ids).set_values(field_name, vals)
+
+        self._buffer = []
+
+
+def _iter_results(samples, sample_evaluator, accumulators, counts):
+    for sample in samples:
+        values, class_stats = sample_evaluator.evaluate(sample)
+        for accumulator, stats in zip(accumulators, class_stats):
+            accumulator.add(stats)
+
+        yield sample.id, values
+
+    counts.update(sample_evaluator.counts)
+
+
+def _iter_results_parallel(
+    sample_collection,
+    samples,
+    eval_kwargs,
+    accumulators,
+    counts,
+    num_workers,
+    shard_size,
+    store_class_stats,
+):
+    # each shard is evaluated with its own evaluator, and the partial
+    # accumulators are merged in shard order, so the results are identical to
+    # those of a serial run. The workers load the dataset by name, which
+    # requires it to be saved to the database, and rebuild the view of the
+    # evaluated collection, so that they see the same labels
+    dataset_name = sample_collection._dataset.name
+    if isinstance(sample_collection, fov.DatasetView):
+        view_stages = sample_collection._serialize()
+    else:
+        view_stages = None
+
+    sample_ids = samples.values("id")
+    shards = (
+        (
+            dataset_name,
+            view_stages,
+            sample_ids[i : i + shard_size],
+            eval_kwargs,
+            store_class_stats,
+        )
+        for i in range(0, len(sample_ids), shard_size)
+    )
+
+    # the shards are merged in order, like a serial run
+    for shard_results in iter_map(_evaluate_shard, shards, num_workers):
+        yield from _collect_shard(shard_results, accumulators, counts)
+
+
+def _collect_shard(shard_results, accumulators, counts):
+    results, shard_accumulators, shard_counts = shard_results
+    counts.update(shard_counts)
+    for accumulator, shard_accumulator in zip(
+        accumulators, shard_accumulators
+    ):
+        accumulator.merge(shard_accumulator)
+
+    return results
+
+
+def _evaluate_shard(
+    dataset_name, view_stages, sample_ids, eval_kwargs, store_class_stats
+):
+    sample_collection = fod.load_dataset(dataset_name)
+    if view_stages is not None:
+        sample_collection = fov.DatasetView._build(
+            sample_collection, view_stages
+        )
+
+    sample_evaluator = _SampleEvaluator(
+        store_class_stats=store_class_stats, **eval_kwargs
+    )
+
+    samples = sample_collection.select(sample_ids).select_fields(
+        sample_evaluator.field_names
+    )
+
+    results = {}
+    for sample in samples:
+        results[sample.id] = sample_evaluator.evaluate(sample)
+
+    # accumulate in the order of the evaluated collection, like a serial run
+    accumulators = sample_evaluator.make_accumulators()
+    for sample_id in sample_ids:
+        class_stats = results[sample_id][1]
+        for accumulator, stats in zip(accumulators, class_stats):
+            accumulator.add(stats)
+
+    return (
+        [(_id, results[_id][0]) for _id in sample_ids],
+        accumulators,
+        sample_evaluator.counts,
+    )
+
+
+def _get_prediction_field_names(prediction_field_name):
+    if isinstance(prediction_field_name, str):
+        return [prediction_field_name]
+
+    return list(prediction_field_name)
+
+
+def _compute_fingerprints(sample_collection, eval_kwargs):
+    # in incremental mode, a sample is only re-evaluated when the fingerprint
+    # of its inputs and of the evaluation config changes. The dataset-level
+    # metrics are then computed from the class stats stored on the samples
+
+    # everything but the label map path, whose contents are hashed instead,
+    # and the cache directory, which does not affect the results
+    config = {
+        k: v
+        for k, v in eval_kwargs.items()
+        if k not in ("label_map_path", "cache_dir")
+    }
+    config["label_map"] = get_file_hash(
+        eval_kwargs["label_map_path"], eval_kwargs["cache_dir"]
+    )
+    config = json.dumps(config, sort_keys=True).encode()
+
+    # only the attributes that affect the evaluation, so that writing the
+    # results back does not change the fingerprints
+    gt_field = eval_kwargs["groundtruth_loc_field_name"]
+    labels_field = eval_kwargs["groundtruth_img_labels_field_name"]
+    paths = [
+        gt_field + ".detections.label",
+        gt_field + ".detections.bounding_box",
+        gt_field + ".detections.IsGroupOf",
+        labels_field + ".classifications.label",
+        labels_field + ".classifications.confidence",
+    ]
+    for pred_field in _get_prediction_field_names(
+        eval_kwargs["prediction_field_name"]
+    ):
+        paths.extend(
+            [
+                pred_field + ".detections.label",
+                pred_field + ".detections.bounding_box",
+                pred_field + ".detections.confidence",
+            ]
+        )
+
+    columns = [sample_collection.values(path) for path in paths]
+    sample_ids = sample_collection.values("id")
+
+    fingerprints = {}
+    for sample_id, sample_values in zip(sample_ids, zip(*columns)):
+        h = hashlib.sha1(config)
+        h.update(repr(sample_values).encode())
+        fingerprints[sample_id] = h.hexdigest()
+
+    return fingerprints
+
+
+def _select_changed_samples(sample_collection, fingerprints):
+    if sample_collection.has_sample_field(FINGERPRINT_FIELD):
+        stored = sample_collection.values(FINGERPRINT_FIELD)
+    else:
+        stored = itertools.repeat(None)
+
+    changed_ids = [
+        sample_id
+        for (sample_id, fingerprint), stored_fingerprint in zip(
+            fingerprints.items(), stored
+        )
+        if fingerprint != stored_fingerprint
+    ]
+
+    return sample_collection.select(changed_ids)
+
+
+def _accumulate_stored_class_stats(sample_collection, num_thresholds):
+    accumulators = [DatasetMetricsAccumulator() for _ in range(num_thresholds)]
+    for stored in sample_collection.values(CLASS_STATS_FIELD):
+        class_stats = _deserialize_class_stats(stored)
+        for accumulator, stats in zip(accumulators, class_stats):
+            accumulator.add(stats)
+
+    return accumulators
+
+
+def _serialize_class_stats(class_stats):
+    return [
+        {
+            class_name: [int(num_gt), scores.tolist(), tp_fp_labels.tolist()]
+            for class_name, (num_gt, scores, tp_fp_labels) in stats.items()
+        }
+        for stats in class_stats
+    ]
+
+
+def _deserialize_class_stats(class_stats):
+    return [
+        {
+            class_name: (
+                num_gt,
+                np.array(scores, dtype=float),
+                np.array(tp_fp_labels, dtype=float),
+            )
+            for class_name, (num_gt, scores, tp_fp_labels) in stats.items()
+        }
+        for stats in class_stats
+    ]
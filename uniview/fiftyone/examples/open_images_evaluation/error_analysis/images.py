@@ -0,0 +1,92 @@
+"""
+Utilities for discovering Open Images format images on disk.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+import hashlib
+import os
+
+
+def iter_image_paths(
+    images_dir,
+    image_ids=None,
+    max_num_images=-1,
+    sample_fraction=None,
+    seed=None,
+    ext=".jpg",
+):
+    """Lazily yields the paths to the <open-images-id>.jpg images in a
+    directory.
+
+    By default the directory is scanned via ``os.scandir`` and the images are
+    yielded in directory order as they are found, so nothing is materialized
+    and the scan stops as soon as ``max_num_images`` images have been
+    yielded.
+
+    If ``image_ids`` are provided, the directory is not listed at all.
+    Instead, the paths to those images are yielded in the given order, and
+    only their files are checked for existence.
+
+    If a ``sample_fraction`` is provided, each image is kept based on a hash
+    of its ID and the ``seed``, so the subsample is deterministic and does not
+    depend on the order in which the images are found.
+
+    Args:
+        images_dir: the directory containing the images
+        image_ids: an optional iterable of Open Images IDs of the images to
+            yield
+        max_num_images: the maximum number of images to yield. -1 implies
+            yield all images
+        sample_fraction: an optional fraction in [0, 1] of the images to yield
+        seed: an optional seed for the subsampling
+        ext: the image extension
+
+    Returns:
+        a generator of image paths
+    """
+    if image_ids is not None:
+        paths = _iter_paths_for_ids(images_dir, image_ids, ext)
+    else:
+        paths = _scan_paths(images_dir, ext)
+
+    if max_num_images == 0:
+        return
+
+    count = 0
+    for image_id, path in paths:
+        if sample_fraction is not None and not _is_sampled(
+            image_id, sample_fraction, seed
+        ):
+            continue
+
+        yield path
+
+        count += 1
+        if count == max_num_images:
+            return
+
+
+def _scan_paths(images_dir, ext):
+    with os.scandir(images_dir) as it:
+        for entry in it:
+            # like glob, hidden files are ignored
+            name = entry.name
+            if name.startswith(".") or not name.endswith(ext):
+                continue
+
+            if entry.is_file():
+                yield name[: -len(ext)], entry.path
+
+
+def _iter_paths_for_ids(images_dir, image_ids, ext):
+    for image_id in image_ids:
+        path = os.path.join(images_dir, image_id + ext)
+        if os.path.isfile(path):
+            yield image_id, path
+
+
+def _is_sampled(image_id, sample_fraction, seed):
+    key = ("%s:%s" % (seed, image_id)).encode()
+    value = int.from_bytes(hashlib.md5(key).digest()[:8], "big")
+    return value < sample_fraction * 2 ** 64
@@ -0,0 +1,424 @@
+"""
+Utilities for reading TF Object Detection API label map ``.pbtxt`` files
+without depending on protobuf or the TF Object Detection API.
+
+Label maps are parsed like protobuf's ``text_format`` parses them, and are
+compiled into arrays of names, IDs and display names, which are memoized per
+process and can be cached on disk by the content hash of the label map, so
+that each label map is only parsed once. All evaluation backends share them.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+from collections import namedtuple
+import os
+import re
+
+import numpy as np
+
+from .cache import get_file_hash
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<skip>\s+|\#[^\n]*)
+    | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    | (?P<int>[-+]?(?:0[xX][0-9A-Fa-f]+|[0-9]+)(?![A-Za-z0-9_.]))
+    | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<punct>[{}<>\[\]:,;])
+    """,
+    re.VERBOSE,
+)
+
+_ESCAPE_RE = re.compile(
+    r"\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|u([0-9A-Fa-f]{4})"
+    r"|U([0-9A-Fa-f]{8})|(.))",
+    re.DOTALL,
+)
+
+_SIMPLE_ESCAPES = {
+    "a": b"\a",
+    "b": b"\b",
+    "f": b"\f",
+    "n": b"\n",
+    "r": b"\r",
+    "t": b"\t",
+    "v": b"\v",
+    "\\": b"\\",
+    "'": b"'",
+    '"': b'"',
+    "?": b"?",
+}
+
+# the fields of a ``StringIntLabelMapItem``, by value type. Message fields
+# map to the fields of the nested message
+_ITEM_FIELDS = {
+    "name": "string",
+    "id": "int",
+    "display_name": "string",
+    "keypoints": {"id": "int", "label": "string"},
+    "ancestor_ids": "int",
+    "descendant_ids": "int",
+    "frequency": "enum",
+    "instance_count": "int",
+}
+
+# the fields of a ``StringIntLabelMap``
+_LABEL_MAP_FIELDS = {"item": _ITEM_FIELDS}
+
+# the repeated fields, whose values are parsed into lists and may also be
+# given as ``[...]`` lists
+_REPEATED_FIELDS = {"item", "keypoints", "ancestor_ids", "descendant_ids"}
+
+# compiled label maps, keyed by path, file size and modification time
+_COMPILED_LABELMAPS = {}
+
+# the items of a label map as parallel arrays, in label map order
+CompiledLabelMap = namedtuple(
+    "CompiledLabelMap", ["names", "ids", "display_names"]
+)
+
+
+def load_labelmap(labelmap_path, cache_dir=None):
+    """Loads labelmap from the labelmap path.
+
+    Args:
+        labelmap_path: Path to the labelmap.
+        cache_dir: an optional directory in which to cache the compiled
+            labelmap, see :func:`compile_labelmap`
+
+    Returns:
+        A dictionary mapping class name to class numerical id
+        A list with dictionaries, one dictionary per category.
+    """
+    labelmap = compile_labelmap(labelmap_path, cache_dir=cache_dir)
+    names = labelmap.names.tolist()
+    ids = labelmap.ids.tolist()
+    display_names = labelmap.display_names.tolist()
+
+    labelmap_dict = dict(zip(names, ids))
+    categories = [
+        {"id": _id, "name": name, "display_name": display_name}
+        for name, _id, display_name in zip(names, ids, display_names)
+    ]
+
+    return labelmap_dict, categories
+
+
+def compile_labelmap(labelmap_path, cache_dir=None):
+    """Returns the compiled items of a label map.
+
+    Compiled label maps are memoized per process by file size and
+    modification time. If a ``cache_dir`` is provided, they are also stored
+    there in ``.npz`` files named by the content hash of the label map, so
+    that other processes, such as evaluation workers and scripts, do not
+    parse it again.
+
+    Args:
+        labelmap_path: the path to the label map ``.pbtxt`` file
+        cache_dir: an optional directory in which to cache the compiled
+            label map
+
+    Returns:
+        a :class:`CompiledLabelMap`
+    """
+    path = os.path.abspath(labelmap_path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+
+    labelmap = _COMPILED_LABELMAPS.get(key, None)
+    if labelmap is None:
+        if cache_dir is None:
+            labelmap = _compile_labelmap(path)
+        else:
+            labelmap = _read_cached_labelmap(path, cache_dir)
+
+        _COMPILED_LABELMAPS[key] = labelmap
+
+    return labelmap
+
+
+def parse_labelmap(label_map_string):
+    """Parses the items of a ``StringIntLabelMap`` in protobuf text format.
+
+    The items are parsed like ``text_format.Merge()`` parses them into a
+    ``StringIntLabelMap`` message:
+
+    -   messages are delimited by ``{ ... }`` or ``< ... >``, and the colon
+        before them is optional. Other top-level fields than ``item`` are
+        not supported
+    -   the ``StringIntLabelMapItem`` fields ``name``, ``id``,
+        ``display_name``, ``keypoints``, ``ancestor_ids``,
+        ``descendant_ids``, ``frequency`` and ``instance_count``, each
+        optionally followed by ``,`` or ``;``. Like protobuf, unknown fields
+        are errors. Repeated fields may also be given as ``[...]`` lists.
+        Only ``name``, ``id`` and ``display_name`` are returned; when a
+        field is repeated, the last value wins
+    -   single or double quoted strings, in which escapes such as ``\\303``
+        and ``\\xa9`` denote bytes and the bytes are decoded as UTF-8, and
+        adjacent strings are concatenated
+    -   decimal, hexadecimal and octal integers, and enum values given by
+        name, such as ``FREQUENT``, or by number
+    -   ``#`` comments
+
+    Args:
+        label_map_string: the contents of a label map ``.pbtxt`` file
+
+    Returns:
+        a list of dicts with keys ``name``, ``id`` and ``display_name``
+
+    Raises:
+        ValueError: if the label map contains anything outside of the
+            supported subset
+    """
+    tokens = _LabelMapTokens(label_map_string)
+    label_map = _parse_fields(tokens, _LABEL_MAP_FIELDS, None)
+
+    return [
+        {
+            "name": fields.get("name", ""),
+            "id": fields.get("id", 0),
+            "display_name": fields.get("display_name", ""),
+        }
+        for fields in label_map.get("item", [])
+    ]
+
+
+class _LabelMapTokens:
+    """The tokens of a label map in protobuf text format.
+
+    Args:
+        label_map_string: the contents of a label map ``.pbtxt`` file
+
+    Raises:
+        ValueError: if the string contains characters that do not form a
+            token
+    """
+
+    def __init__(self, label_map_string):
+        self._string = label_map_string
+        self._tokens = []
+        self._index = 0
+
+        pos = 0
+        while pos < len(label_map_string):
+            match = _TOKEN_RE.match(label_map_string, pos)
+            if match is None:
+                raise ValueError(
+                    "Unexpected character %r in label map on line %d"
+                    % (label_map_string[pos], self._get_line(pos))
+                )
+
+            if match.lastgroup != "skip":
+                self._tokens.append((match.lastgroup, match.group(), pos))
+
+            pos = match.end()
+
+    def done(self):
+        """Whether all tokens have been consumed."""
+        return self._index >= len(self._tokens)
+
+    def accept(self, value):
+        """Consumes the next token if it is the given punctuation.
+
+        Args:
+            value: the punctuation
+
+        Returns:
+            True if the token was consumed
+        """
+        if not self.done() and self._tokens[self._index][1] == value:
+            self._index += 1
+            return True
+
+        return False
+
+    def expect(self, kind, value=None):
+        """Consumes the next token, which must be of the given kind.
+
+        Args:
+            kind: the token kind, ``"string"``, ``"int"``, ``"ident"``,
+                ``"enum"`` or ``"punct"``
+            value: an optional value that the token must have
+
+        Returns:
+            the parsed value of the token
+
+        Raises:
+            ValueError: if the next token is missing or does not match
+        """
+        if self.done():
+            raise ValueError(
+                "Unexpected end of label map, expected %s"
+                % (repr(value) if value is not None else kind)
+            )
+
+        # enum values may be given by name or by number
+        kinds = ("ident", "int") if kind == "enum" else (kind,)
+
+        token_kind, token, pos = self._tokens[self._index]
+        if token_kind not in kinds or (value is not None and token != value):
+            raise ValueError(
+                "Unexpected %r in label map on line %d, expected %s"
+                % (
+                    token,
+                    self._get_line(pos),
+                    repr(value) if value is not None else kind,
+                )
+            )
+
+        self._index += 1
+
+        if token_kind == "string":
+            # adjacent strings are concatenated before decoding
+            value = _unescape(token[1:-1])
+            while self._peek() == "string":
+                value += _unescape(self._tokens[self._index][1][1:-1])
+                self._index += 1
+
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                raise ValueError(
+                    "Invalid UTF-8 string %r in label map on line %d"
+                    % (token, self._get_line(pos))
+                )
+
+        if token_kind == "int":
+            return _parse_int(token)
+
+        return token
+
+    def _peek(self):
+        if self.done():
+            return None
+
+        return self._tokens[self._index][0]
+
+    def _get_line(self, pos):
+        return self._string.count("\n", 0, pos) + 1
+
+
+def _parse_fields(tokens, fields, end):
+    # parses fields until the given closing punctuation, or the end of the
+    # tokens if it is None
+    values = {}
+    while not (tokens.done() if end is None else tokens.accept(end)):
+        key = tokens.expect("ident")
+        if key not in fields:
+            raise ValueError("Unknown label map field %r" % key)
+
+        # the colon before a message value is optional
+        kind = fields[key]
+        if isinstance(kind, dict):
+            tokens.accept(":")
+        else:
+            tokens.expect("punct", ":")
+
+        if key not in _REPEATED_FIELDS:
+            values[key] = _parse_value(tokens, kind)
+        elif tokens.accept("["):
+            field_values = values.setdefault(key, [])
+            if not tokens.accept("]"):
+                field_values.append(_parse_value(tokens, kind))
+                while tokens.accept(","):
+                    field_values.append(_parse_value(tokens, kind))
+
+                tokens.expect("punct", "]")
+        else:
+            values.setdefault(key, []).append(_parse_value(tokens, kind))
+
+        if not tokens.accept(","):
+            tokens.accept(";")
+
+    return values
+
+
+def _parse_value(tokens, kind):
+    if not isinstance(kind, dict):
+        return tokens.expect(kind)
+
+    # messages are delimited by braces or angle brackets
+    if tokens.accept("<"):
+        return _parse_fields(tokens, kind, ">")
+
+    tokens.expect("punct", "{")
+    return _parse_fields(tokens, kind, "}")
+
+
+def _unescape(string):
+    # C-style escapes denote bytes, or the UTF-8 encoded code points of
+    # Unicode escapes, like in protobuf's text format
+    chunks = []
+    pos = 0
+    for match in _ESCAPE_RE.finditer(string):
+        chunks.append(string[pos : match.start()].encode("utf-8"))
+        octal, hexadecimal, code_point, long_code_point, char = match.groups()
+        if octal is not None:
+            value = int(octal, 8)
+            if value > 0xFF:
+                raise ValueError("Invalid octal escape %r" % match.group())
+
+            chunks.append(bytes([value]))
+        elif hexadecimal is not None:
+            chunks.append(bytes([int(hexadecimal, 16)]))
+        elif code_point is not None or long_code_point is not None:
+            value = int(code_point or long_code_point, 16)
+            try:
+                chunks.append(chr(value).encode("utf-8"))
+            except (OverflowError, ValueError, UnicodeEncodeError):
+                raise ValueError("Invalid Unicode escape %r" % match.group())
+        elif char in _SIMPLE_ESCAPES:
+            chunks.append(_SIMPLE_ESCAPES[char])
+        else:
+            raise ValueError("Invalid escape %r" % match.group())
+
+        pos = match.end()
+
+    chunks.append(string[pos:].encode("utf-8"))
+    return b"".join(chunks)
+
+
+def _parse_int(token):
+    # like protobuf, a leading 0 denotes an octal integer
+    sign = -1 if token.startswith("-") else 1
+    digits = token.lstrip("+-")
+    if digits[:2] in ("0x", "0X"):
+        return sign * int(digits[2:], 16)
+
+    if len(digits) > 1 and digits.startswith("0"):
+        return sign * int(digits, 8)
+
+    return sign * int(digits)
+
+
+def _compile_labelmap(labelmap_path):
+    with open(labelmap_path, "r") as fid:
+        items = parse_labelmap(fid.read())
+
+    return CompiledLabelMap(
+        names=np.array([item["name"] for item in items], dtype=str),
+        ids=np.array([item["id"] for item in items], dtype=np.int64),
+        display_names=np.array(
+            [item["display_name"] for item in items], dtype=str
+        ),
+    )
+
+
+def _read_cached_labelmap(labelmap_path, cache_dir):
+    file_hash = get_file_hash(labelmap_path, cache_dir)
+    cache_path = os.path.join(cache_dir, file_hash + ".labelmap.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            return CompiledLabelMap(**{k: data[k] for k in data.files})
+
+    labelmap = _compile_labelmap(labelmap_path)
+
+    # write atomically so that concurrent workers never read partial files
+    tmp_path = "%s.%d.tmp" % (cache_path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **labelmap._asdict())
+
+    os.replace(tmp_path, cache_path)
+
+    return labelmap
@@ -5,7 +5,7 @@ Dataset representation.
 Copyright 2017-2021, Voxel51, Inc.
 voxel51.com
 """
-import glob
+from functools import partial
 import os
 
 import numpy as np
@@ -16,6 +16,11 @@ import fiftyone.core.labels as fol
 import fiftyone.core.sample as fos
 import fiftyone.core.utils as fou
 
+from .cache import read_cached
+from .images import iter_image_paths
+from .labelmap import compile_labelmap
+from .parallel import iter_map
+
 
 # supplemental columns
 CLASSIFICATION_COLUMNS = ["Source"]
@@ -33,6 +38,39 @@ OPEN_IMAGES_ID = "open_images_id"
 GT_IMAGE_LABELS = "groundtruth_image_labels"
 GT_DETECTIONS = "groundtruth_detections"
 
+# compact schema of annotation and prediction tables. IDs such as
+# "0001234567890123" must not be parsed as numbers. Confidences and box
+# coordinates are stored on the samples, so they keep the inferred int64 or
+# float64 dtype of the CSV; narrowing them would write float32 noise into the
+# dataset
+ANNOTATION_DTYPES = {
+    "ImageID": str,
+    "LabelName": "category",
+    "Source": "category",
+    "IsOccluded": np.int8,
+    "IsTruncated": np.int8,
+    "IsGroupOf": np.int8,
+    "IsDepiction": np.int8,
+    "IsInside": np.int8,
+    "ConfidenceImageLabel": np.int8,
+}
+
+# per-image frames are only read by the evaluator, so they can use float32.
+# They keep plain string labels, which the evaluator maps to class IDs
+_FRAME_DTYPES = {
+    **{
+        k: v
+        for k, v in ANNOTATION_DTYPES.items()
+        if k not in ("ImageID", "LabelName", "Source")
+    },
+    "Confidence": np.float32,
+    "Score": np.float32,
+    "XMin": np.float32,
+    "XMax": np.float32,
+    "YMin": np.float32,
+    "YMax": np.float32,
+}
+
 
 def load_open_images_dataset(
     dataset_name,
@@ -44,6 +82,15 @@ def load_open_images_dataset(
     class_descriptions_path=None,
     load_images_with_preds=False,
     max_num_images=-1,
+    streaming=False,
+    chunk_size=100000,
+    batch_size=1000,
+    cache_dir=None,
+    num_workers=None,
+    incremental=False,
+    images_from_annotations=False,
+    sample_fraction=None,
+    seed=None,
 ):
     """Loads an Open Images format dataset into FiftyOne.
 
@@ -54,6 +101,35 @@ def load_open_images_dataset(
 
     such that this function only needs to be called once!
 
+    By default the CSVs are read fully into memory. If ``streaming`` is True,
+    the CSVs are instead read ``chunk_size`` rows at a time, which requires
+    them to be sorted by ImageID (as the official Open Images CSVs are) and
+    keeps memory usage independent of the size of the CSVs. In both modes the
+    samples are added to the dataset in batches of ``batch_size``.
+
+    If a ``cache_dir`` is provided, the parsed CSVs are cached there as
+    Parquet files keyed by the contents of the CSVs, so that subsequent loads
+    of the same CSVs skip the CSV parsing. The cache is not used when
+    streaming.
+
+    If ``num_workers`` is provided, the images are split into shards of
+    ``batch_size`` images whose samples are built in a pool of worker
+    processes. The shards are added to the dataset in order, so the resulting
+    dataset is identical to the one built serially.
+
+    If ``incremental`` is True and a dataset named ``dataset_name`` already
+    exists, only the images whose ``open_images_id`` is not yet in the dataset
+    are added to it. The dataset is made persistent before the first batch is
+    added, so each added batch is a checkpoint from which an interrupted load
+    can be resumed by calling this function again with the same arguments.
+
+    By default, the images are discovered by lazily scanning ``images_dir``,
+    which stops as soon as ``max_num_images`` images have been found. If
+    ``load_images_with_preds`` or ``images_from_annotations`` is True, the
+    images are instead discovered from the ImageIDs in the CSVs, in which
+    case the directory is not listed and only the files of those images are
+    checked for existence.
+
     Args:
         dataset_name: the name of the dataset to create in FiftyOne.
         images_dir: directory where images are stored. Images should be in
@@ -66,94 +142,372 @@ def load_open_images_dataset(
         prediction_field_name: the name of the field to save the predictions
             under. Useful if other predictions may be added later
         class_descriptions_path: optional metadata file. if provided, the
-            MID labels are mapped to descriptive labels
+            MID labels are mapped to descriptive labels. A label map
+            ``.pbtxt`` file can be provided instead of the class descriptions
+            CSV, in which case its compiled label map is used
         load_images_with_preds: if True, skip any images that do not have
             predictions
+        max_num_images: the maximum number of images to load. -1 implies load
+            all images
+        streaming: whether to stream the CSVs in ImageID-sorted chunks rather
+            than reading them fully into memory
+        chunk_size: the number of CSV rows to read at a time when streaming
+        batch_size: the number of samples to add to the dataset at a time
+        cache_dir: an optional directory in which to cache the parsed CSVs
+        num_workers: an optional number of worker processes to use to build
+            the samples. By default, the samples are built in this process
+        incremental: whether to add the missing images to an existing dataset
+            rather than creating a new one
+        images_from_annotations: if True, only load the images that appear in
+            at least one of the provided CSVs
+        sample_fraction: an optional fraction in [0, 1] of the images to load,
+            selected deterministically based on a hash of their IDs
+        seed: an optional seed for the ``sample_fraction`` subsampling
 
     Returns:
         a :class:`fiftyone.core.dataset.Dataset` instance
     """
     # pylint: disable=unsubscriptable-object
-    # read data from disk
-    all_location_annotations = (
-        pd.read_csv(bounding_boxes_path) if bounding_boxes_path else None
-    )
-    all_label_annotations = (
-        pd.read_csv(image_labels_path) if image_labels_path else None
-    )
-    if predictions_path:
-        all_predictions = pd.read_csv(predictions_path)
-        all_predictions.rename(columns={"Score": "Confidence"}, inplace=True)
+    # streamed chunks are label-mapped as they are read
+    if streaming:
+        class_descriptions = _read_class_descriptions(
+            class_descriptions_path, cache_dir=cache_dir
+        )
+    else:
+        class_descriptions = None
+
+    csvs = [
+        (GT_IMAGE_LABELS, image_labels_path, df2classifications),
+        (GT_DETECTIONS, bounding_boxes_path, df2detections),
+        (prediction_field_name, predictions_path, df2detections),
+    ]
+
+    # index each CSV by ImageID so that per-image lookups are slices
+    sources = []
+    indexes = {}
+    for field_name, csv_path, converter in csvs:
+        if not csv_path:
+            continue
+
+        if streaming:
+            index = _StreamingImageIndex(
+                _iter_image_groups(csv_path, chunk_size, class_descriptions)
+            )
+        else:
+            index = _ImageIndex(
+                _read_annotations(
+                    csv_path,
+                    class_descriptions_path=class_descriptions_path,
+                    cache_dir=cache_dir,
+                )
+            )
+
+        sources.append((field_name, index, converter))
+        indexes[csv_path] = index
+
+    if load_images_with_preds:
+        id_csv_paths = [predictions_path]
+    elif images_from_annotations:
+        id_csv_paths = list(indexes.keys())
+    else:
+        id_csv_paths = None
+
+    if id_csv_paths is not None:
+        if streaming:
+            id_sets = [_read_image_ids(p, chunk_size) for p in id_csv_paths]
+        else:
+            id_sets = [set(indexes[p].image_ids) for p in id_csv_paths]
+
+        image_ids = sorted(set().union(*id_sets))
     else:
-        all_predictions = None
-    class_descriptions = (
-        pd.read_csv(class_descriptions_path, header=None, index_col=0)
-        if class_descriptions_path
-        else None
+        image_ids = None
+
+    img_paths = list(
+        iter_image_paths(
+            images_dir,
+            image_ids=image_ids,
+            max_num_images=max_num_images,
+            sample_fraction=sample_fraction,
+            seed=seed,
+        )
     )
 
-    # map label MID to descriptive label
-    if class_descriptions is not None:
-        for df in [
-            all_location_annotations,
-            all_label_annotations,
-            all_predictions,
-        ]:
-            if df is None:
-                continue
+    if streaming:
+        # streamed CSVs can only be consumed in ImageID order
+        img_paths.sort(key=_get_image_id)
 
-            temp = class_descriptions.loc[df["LabelName"], 1]
-            temp.index = df.index
-            df["LabelName"] = temp
+    if incremental and fod.dataset_exists(dataset_name):
+        print("Loading existing FiftyOne Dataset...")
+        dataset = fod.load_dataset(dataset_name)
 
-    if load_images_with_preds:
+        loaded_ids = set(dataset.distinct(OPEN_IMAGES_ID))
         img_paths = [
-            os.path.join(images_dir, image_id + ".jpg")
-            for image_id in set(all_predictions["ImageID"])
+            p for p in img_paths if _get_image_id(p) not in loaded_ids
         ]
+        print("Found %d images already in the dataset" % len(loaded_ids))
     else:
-        img_paths = glob.glob(os.path.join(images_dir, "*.jpg"))
+        print("Creating FiftyOne Dataset...")
+        dataset = fod.Dataset(dataset_name)
 
-    if max_num_images != -1:
-        img_paths = img_paths[:max_num_images]
+    if incremental:
+        # so that the batches added so far survive an interruption
+        dataset.persistent = True
+
+    if num_workers:
+        samples = _iter_samples_parallel(
+            img_paths, sources, num_workers, batch_size
+        )
+    else:
+        samples = (_make_sample(p, sources) for p in img_paths)
 
     print("Parsing CSV labels...")
-    _samples = []
+    batch = []
     with fou.ProgressBar(img_paths) as pb:
-        for image_path in pb(img_paths):
-            image_id = os.path.splitext(os.path.basename(image_path))[0]
+        for sample in pb(samples):
+            batch.append(sample)
+            if len(batch) >= batch_size:
+                dataset.add_samples(batch)
+                batch = []
 
-            kwargs = {"filepath": image_path, OPEN_IMAGES_ID: image_id}
+    if batch:
+        dataset.add_samples(batch)
 
-            # parse ground truth image labels
-            if all_label_annotations is not None:
-                cur_lab_anns = all_label_annotations.query(
-                    "ImageID == '%s'" % image_id
-                )
-                if not cur_lab_anns.empty:
-                    kwargs[GT_IMAGE_LABELS] = df2classifications(cur_lab_anns)
+    return dataset
 
-            # parse ground truth bounding boxes
-            if all_location_annotations is not None:
-                cur_loc_anns = all_location_annotations.query(
-                    "ImageID == '%s'" % image_id
-                )
-                if not cur_loc_anns.empty:
-                    kwargs[GT_DETECTIONS] = df2detections(cur_loc_anns)
 
-            # parse prediction bounding boxes
-            if all_predictions is not None:
-                cur_preds = all_predictions.query("ImageID == '%s'" % image_id)
-                if not cur_preds.empty:
-                    kwargs[prediction_field_name] = df2detections(cur_preds)
+def _read_annotations(csv_path, class_descriptions_path=None, cache_dir=None):
+    if cache_dir is not None:
+        return read_cached(
+            partial(_parse_annotations, cache_dir=cache_dir),
+            [csv_path, class_descriptions_path],
+            cache_dir,
+        )
+
+    return _parse_annotations(csv_path, class_descriptions_path)
+
 
-            _samples.append(fos.Sample(**kwargs))
+def _parse_annotations(csv_path, class_descriptions_path, cache_dir=None):
+    df = pd.read_csv(csv_path, dtype=ANNOTATION_DTYPES)
+    class_descriptions = _read_class_descriptions(
+        class_descriptions_path, cache_dir=cache_dir
+    )
+    _prepare_annotations(df, class_descriptions)
+    return df
 
-    print("Creating FiftyOne Dataset...")
-    dataset = fod.Dataset(dataset_name)
-    dataset.add_samples(_samples)
 
-    return dataset
+def _read_class_descriptions(class_descriptions_path, cache_dir=None):
+    if not class_descriptions_path:
+        return None
+
+    # the compiled label map maps the same MIDs to the same display names
+    if class_descriptions_path.endswith(".pbtxt"):
+        labelmap = compile_labelmap(
+            class_descriptions_path, cache_dir=cache_dir
+        )
+        return pd.DataFrame(
+            {1: labelmap.display_names}, index=pd.Index(labelmap.names, name=0)
+        )
+
+    return pd.read_csv(class_descriptions_path, header=None, index_col=0)
+
+
+def _prepare_annotations(df, class_descriptions):
+    # predictions are scored, annotations have a confidence
+    df.rename(columns={"Score": "Confidence"}, inplace=True)
+
+    # map label MID to descriptive label. Only the categories need mapping
+    if class_descriptions is not None:
+        labels = df["LabelName"].astype("category")
+        display_names = class_descriptions.loc[labels.cat.categories, 1]
+        df["LabelName"] = pd.Categorical(
+            display_names.to_numpy()[labels.cat.codes]
+        )
+
+
+def _read_image_ids(csv_path, chunk_size):
+    image_ids = set()
+    chunks = pd.read_csv(
+        csv_path,
+        usecols=["ImageID"],
+        dtype=ANNOTATION_DTYPES,
+        chunksize=chunk_size,
+    )
+    for chunk in chunks:
+        image_ids.update(chunk["ImageID"])
+
+    return image_ids
+
+
+def _iter_image_groups(csv_path, chunk_size, class_descriptions=None):
+    """Reads an ImageID-sorted annotation CSV ``chunk_size`` rows at a time and
+    yields ``(image_id, df)`` tuples, one per image, in ImageID order.
+
+    Rows of an image that straddle a chunk boundary are carried over to the
+    next chunk, so each image is yielded exactly once.
+    """
+    carry = None
+    chunks = pd.read_csv(
+        csv_path, dtype=ANNOTATION_DTYPES, chunksize=chunk_size
+    )
+    for chunk in chunks:
+        _prepare_annotations(chunk, class_descriptions)
+        if carry is not None:
+            chunk = pd.concat([carry, chunk])
+
+        image_ids = chunk["ImageID"].to_numpy()
+        if (image_ids[1:] < image_ids[:-1]).any():
+            raise ValueError(
+                "CSV '%s' must be sorted by ImageID in order to be streamed"
+                % csv_path
+            )
+
+        starts, stops = _get_group_bounds(image_ids)
+
+        # the last image may continue in the next chunk
+        for start, stop in zip(starts[:-1], stops[:-1]):
+            yield image_ids[start], chunk.iloc[start:stop]
+
+        carry = chunk.iloc[starts[-1] :]
+
+    if carry is not None and not carry.empty:
+        yield carry["ImageID"].iloc[0], carry
+
+
+def _get_group_bounds(image_ids):
+    # [start, stop) bounds of each run of equal consecutive IDs
+    boundaries = np.flatnonzero(image_ids[1:] != image_ids[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(image_ids)]))
+    return starts, stops
+
+
+def _get_image_id(image_path):
+    return os.path.splitext(os.path.basename(image_path))[0]
+
+
+class _ImageIndex:
+    """Index of the rows of an annotation DataFrame by ImageID.
+
+    The rows are sorted by ImageID once (stable, so the original row order
+    within each image is preserved) and the ``[start, stop)`` slice of every
+    image is recorded, so that looking up the rows of an image is a dictionary
+    lookup plus a slice rather than a scan of the whole DataFrame.
+
+    Args:
+        df: a pandas.DataFrame with an ``ImageID`` column
+    """
+
+    def __init__(self, df):
+        df = df.sort_values("ImageID", kind="mergesort")
+        self._df = df.reset_index(drop=True)
+        self._slices = {}
+
+        if self._df.empty:
+            return
+
+        image_ids = self._df["ImageID"].to_numpy()
+        starts, stops = _get_group_bounds(image_ids)
+        for start, stop in zip(starts, stops):
+            self._slices[image_ids[start]] = (start, stop)
+
+    @property
+    def image_ids(self):
+        """The Open Images IDs with at least one row."""
+        return list(self._slices.keys())
+
+    def get(self, image_id):
+        """Returns the rows for the given image.
+
+        Args:
+            image_id: the Open Images ID
+
+        Returns:
+            a pandas.DataFrame, or None if the image has no rows
+        """
+        span = self._slices.get(image_id, None)
+        if span is None:
+            return None
+
+        return self._df.iloc[span[0] : span[1]]
+
+
+class _StreamingImageIndex:
+    """Index of the rows of an ImageID-sorted annotation CSV that is read
+    lazily.
+
+    Unlike :class:`_ImageIndex`, only the rows of the current image are held
+    in memory, so images must be looked up in increasing ImageID order.
+
+    Args:
+        groups: an iterator of ``(image_id, df)`` tuples in ImageID order, as
+            returned by :func:`_iter_image_groups`
+    """
+
+    def __init__(self, groups):
+        self._groups = groups
+        self._current = next(self._groups, None)
+
+    def get(self, image_id):
+        """Returns the rows for the given image.
+
+        Args:
+            image_id: the Open Images ID. Must not be smaller than the ID of
+                the previous call
+
+        Returns:
+            a pandas.DataFrame, or None if the image has no rows
+        """
+        while self._current is not None and self._current[0] < image_id:
+            self._current = next(self._groups, None)
+
+        if self._current is not None and self._current[0] == image_id:
+            return self._current[1]
+
+        return None
+
+
+def _make_sample(image_path, sources):
+    image_id = _get_image_id(image_path)
+
+    kwargs = {"filepath": image_path, OPEN_IMAGES_ID: image_id}
+    for field_name, index, converter in sources:
+        rows = index.get(image_id)
+        if rows is not None:
+            kwargs[field_name] = converter(rows)
+
+    return fos.Sample(**kwargs)
+
+
+def _iter_samples_parallel(img_paths, sources, num_workers, shard_size):
+    shards = (
+        _make_shard(img_paths[i : i + shard_size], sources)
+        for i in range(0, len(img_paths), shard_size)
+    )
+
+    for sample_dicts in iter_map(_build_shard, shards, num_workers):
+        for d in sample_dicts:
+            yield fos.Sample.from_dict(d)
+
+
+def _make_shard(img_paths, sources):
+    shard_sources = []
+    for field_name, index, converter in sources:
+        # lookups must happen in image order to support streamed sources
+        dfs = [index.get(_get_image_id(p)) for p in img_paths]
+        dfs = [df for df in dfs if df is not None]
+        if dfs:
+            shard_sources.append((field_name, pd.concat(dfs), converter))
+
+    return img_paths, shard_sources
+
+
+def _build_shard(img_paths, shard_sources):
+    sources = [
+        (field_name, _ImageIndex(df), converter)
+        for field_name, df, converter in shard_sources
+    ]
+
+    return [_make_sample(p, sources).to_dict() for p in img_paths]
 
 
 def add_open_images_predictions(
@@ -161,42 +515,65 @@ def add_open_images_predictions(
     predictions_path,
     class_descriptions_path=None,
     prediction_field_name="predicted_detections",
+    cache_dir=None,
+    batch_size=1000,
 ):
     """Adds TF Object Detection API format predictions to a
     :class:`fiftyone.core.dataset.Dataset`.
 
+    The predictions are grouped by ImageID once, converted to labels one batch
+    of ``batch_size`` samples at a time and written to the dataset with one
+    bulk update per batch. Samples without predictions are left untouched.
+
     Args:
         dataset: the :class:`fiftyone.core.dataset.Dataset` instance to add
             the predictions to
         predictions_path: path to a TF Object Detection API format
             predictions CSV
         class_descriptions_path: optional metadata file. if provided, the
-            MID labels are mapped to descriptive labels
+            MID labels are mapped to descriptive labels. A label map
+            ``.pbtxt`` file can be provided instead of the class descriptions
+            CSV, in which case its compiled label map is used
         prediction_field_name: the name of the field to save the predictions
             under
+        cache_dir: an optional directory in which to cache the parsed CSV
+        batch_size: the number of samples to update at a time
     """
-    all_predictions = pd.read_csv(predictions_path)
-    all_predictions.rename(columns={"Score": "Confidence"}, inplace=True)
-
-    # map label MID to descriptive label
-    if class_descriptions_path is not None:
-        class_descriptions = pd.read_csv(
-            class_descriptions_path, header=None, index_col=0
+    all_predictions = _ImageIndex(
+        _read_annotations(
+            predictions_path,
+            class_descriptions_path=class_descriptions_path,
+            cache_dir=cache_dir,
         )
+    )
 
-        temp = class_descriptions.loc[all_predictions["LabelName"], 1]
-        temp.index = all_predictions.index
-        all_predictions["LabelName"] = temp
-
-    with fou.ProgressBar(dataset) as pb:
-        for sample in pb(dataset):
-            # parse prediction bounding boxes
-            cur_preds = all_predictions.loc[
-                all_predictions["ImageID"] == sample[OPEN_IMAGES_ID]
+    # samples with predictions, in dataset order
+    matches = []
+    for sample_id, image_id in zip(
+        dataset.values("id"), dataset.values(OPEN_IMAGES_ID)
+    ):
+        cur_preds = all_predictions.get(image_id)
+        if cur_preds is not None:
+            matches.append((sample_id, cur_preds))
+
+    with fou.ProgressBar(matches) as pb:
+        for i in range(0, len(matches), batch_size):
+            batch = matches[i : i + batch_size]
+            sample_ids = [sample_id for sample_id, _ in batch]
+            dfs = [cur_preds for _, cur_preds in batch]
+
+            # convert the whole batch at once and split it back up by image
+            detections = _df2detection_list(pd.concat(dfs))
+            bounds = np.cumsum([0] + [len(df) for df in dfs])
+            values = [
+                fol.Detections(detections=detections[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:])
             ]
-            if not cur_preds.empty:
-                sample[prediction_field_name] = df2detections(cur_preds)
-                sample.save()
+
+            dataset.select(sample_ids).set_values(
+                prediction_field_name, values
+            )
+            pb.update(count=len(batch))
 
 
 def df2classifications(df):
@@ -215,18 +592,7 @@ def df2classifications(df):
     Returns:
          a :class:`fiftyone.core.labels.Classifications` instance
     """
-    supplemental_columns = [fn for fn in CLASSIFICATION_COLUMNS if fn in df]
-
-    return fol.Classifications(
-        classifications=[
-            fol.Classification(
-                label=row.LabelName,
-                confidence=row.Confidence,
-                **{sc: row[sc] for sc in supplemental_columns},
-            )
-            for _, row in df.iterrows()
-        ]
-    )
+    return fol.Classifications(classifications=_df2classification_list(df))
 
 
 def df2detections(df):
@@ -254,25 +620,55 @@ def df2detections(df):
     Returns:
          a :class:`fiftyone.core.labels.Detections` instance
     """
-    supplemental_columns = [fn for fn in DETECTION_COLUMNS if fn in df]
+    return fol.Detections(detections=_df2detection_list(df))
 
-    return fol.Detections(
-        detections=[
-            fol.Detection(
-                label=row.LabelName,
-                confidence=row.Confidence,
-                # [<top-left-x>, <top-right-y>, <width>, <height>]
-                bounding_box=[
-                    row.XMin,
-                    row.YMin,
-                    row.XMax - row.XMin,
-                    row.YMax - row.YMin,
-                ],
-                **{sc: row[sc] for sc in supplemental_columns},
-            )
-            for _, row in df.iterrows()
-        ]
-    )
+
+def _df2classification_list(df):
+    # pull each column out once rather than boxing every row into a Series
+    supplemental_columns = [fn for fn in CLASSIFICATION_COLUMNS if fn in df]
+    supplemental_values = [df[sc].tolist() for sc in supplemental_columns]
+
+    return [
+        fol.Classification(
+            label=label,
+            confidence=confidence,
+            **dict(zip(supplemental_columns, values)),
+        )
+        for label, confidence, *values in zip(
+            df["LabelName"].tolist(),
+            df["Confidence"].tolist(),
+            *supplemental_values,
+        )
+    ]
+
+
+def _df2detection_list(df):
+    # pull each column out once rather than boxing every row into a Series
+    supplemental_columns = [fn for fn in DETECTION_COLUMNS if fn in df]
+    supplemental_values = [df[sc].tolist() for sc in supplemental_columns]
+
+    xmin = df["XMin"].to_numpy()
+    xmax = df["XMax"].to_numpy()
+    ymin = df["YMin"].to_numpy()
+    ymax = df["YMax"].to_numpy()
+
+    # [<top-left-x>, <top-right-y>, <width>, <height>]
+    bboxes = np.stack([xmin, ymin, xmax - xmin, ymax - ymin], axis=1).tolist()
+
+    return [
+        fol.Detection(
+            label=label,
+            confidence=confidence,
+            bounding_box=bbox,
+            **dict(zip(supplemental_columns, values)),
+        )
+        for label, confidence, bbox, *values in zip(
+            df["LabelName"].tolist(),
+            df["Confidence"].tolist(),
+            bboxes,
+            *supplemental_values,
+        )
+    ]
 
 
 def classifications2df(image_id, classifications, display2name_map=None):
@@ -306,7 +702,7 @@ def classifications2df(image_id, classifications, display2name_map=None):
     for col in CLASSIFICATION_COLUMNS:
         d[col] = [lab[col] for lab in labs]
 
-    return pd.DataFrame(d)
+    return _apply_dtypes(pd.DataFrame(d), _FRAME_DTYPES)
 
 
 def detections2df(
@@ -327,7 +723,8 @@ def detections2df(
     """
     confidence_key = "Confidence" if is_groundtruth else "Score"
 
-    if detections is None:
+    # images without detections have no boxes to stack
+    if detections is None or not detections.detections:
         columns = ["ImageID", "LabelName"]
         if is_groundtruth:
             columns += [
@@ -342,7 +739,7 @@ def detections2df(
         # these columns need to be float dtype
         df2 = pd.DataFrame(
             columns=[confidence_key, "XMin", "XMax", "YMin", "YMax"],
-            dtype=float,
+            dtype=np.float32,
         )
         for col in df2.columns:
             df[col] = df2[col]
@@ -380,4 +777,8 @@ def detections2df(
         ]:
             d[col_name] = [int(det[col_name]) for det in dets]
 
-    return pd.DataFrame(d)
+    return _apply_dtypes(pd.DataFrame(d), _FRAME_DTYPES)
+
+
+def _apply_dtypes(df, dtypes):
+    return df.astype({k: v for k, v in dtypes.items() if k in df})
@@ -0,0 +1,1118 @@
+"""
+Pure NumPy implementation of the per-image Open Images Challenge object
+detection evaluation of the Tensorflow Object Detection API.
+
+It follows the protocol of
+object_detection.utils.object_detection_evaluation.OpenImagesChallengeEvaluator:
+
+    - only the classes that are verified at the image level or that have
+      ground truth boxes are evaluated; predictions of other classes are
+      ignored
+    - predictions of each class are matched greedily in decreasing score
+      order to the non-group-of ground truth box with the highest IoU
+    - unmatched predictions that lie inside a group-of box (by IoA) are not
+      counted individually; instead, each such group-of box counts as a
+      single true positive with the highest score of its predictions
+
+but needs neither TensorFlow nor a checkout of the TF models repository.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from .labelmap import load_labelmap
+
+
+# prediction verdicts
+TRUE_POSITIVE = 1
+FALSE_POSITIVE = 0
+IGNORED = -1
+
+# the slice of box sizes, which buckets boxes by their area relative to
+# the image area
+BOX_SIZE = "BoxSize"
+BOX_SIZE_EDGES = [0.01, 0.1]
+BOX_SIZE_NAMES = ["small", "medium", "large"]
+
+# the ground truth attributes by which the metrics can be sliced
+SLICE_ATTRIBUTES = [
+    "IsOccluded",
+    "IsTruncated",
+    "IsGroupOf",
+    "IsDepiction",
+    "IsInside",
+    "Source",
+    BOX_SIZE,
+]
+
+# the slice of the ground truth whose attribute value is missing
+MISSING_SLICE_VALUE = "missing"
+
+_BOX_COLUMNS = ["YMin", "XMin", "YMax", "XMax"]
+
+
+class NumpyObjectDetectionEvaluator:
+    """Drop-in replacement for
+    :class:`error_analysis.evaluation.TensorflowObjectDetectionAPIEvaluator`
+    that evaluates images in pure NumPy.
+    """
+
+    def __init__(self, class_label_map_path, iou_threshold=0.5, slices=None):
+        """
+        Args:
+            class_label_map_path: path to the label map .pbtxt file
+            iou_threshold: an IoU threshold or a list of IoU thresholds, in
+                which case the IoUs of each image are computed once and
+                reused for every threshold
+            slices: an optional list of :const:`SLICE_ATTRIBUTES` by which to
+                slice the results, see :func:`compute_slice_stats`
+        """
+        self._iou_threshold = iou_threshold
+        self._slices = slices
+
+        self._class_label_map, self._categories = load_labelmap(
+            class_label_map_path
+        )
+        self._reverse_label_map = {
+            v: k for k, v in self._class_label_map.items()
+        }
+
+        # the last parsed ground truth, which is reused when several
+        # predictions are evaluated against the same ground truth
+        self._groundtruth = None
+        self._parsed_groundtruth = None
+
+        # the numbers of evaluated images and of images without predictions
+        # or located ground truth, whose predictions are not matched
+        self.counts = Counter()
+
+    def evaluate_image(self, image_id, groundtruth, predictions):
+        """Evaluates a single image.
+
+        Args:
+            image_id (str): the Open Images ID
+            groundtruth: pandas.DataFrame with columns:
+                'ImageID', 'Source', 'LabelName', 'Confidence',
+                'XMin', 'XMax', 'YMin', 'YMax',
+                'IsOccluded', 'IsTruncated', 'IsGroupOf', 'IsDepiction',
+                'IsInside', 'ConfidenceImageLabel'
+            predictions: pandas.DataFrame with columns:
+                'ImageID', 'LabelName', 'Score', 'XMin', 'XMax', 'YMin', 'YMax'
+
+        Returns:
+            a dictionary with structure:
+                {
+                    "true_positive_indexes": [<IDX1>, <IDX2>, ...],
+                    "false_positive_indexes": [<IDX1>, <IDX2>, ...],
+                    "mAP": <mAP>,
+                    "AP_per_class": {
+                        "<LabelName>": <AP>,
+                        "<LabelName>": <AP>,
+                        ...
+                    },
+                    "class_stats": {
+                        "<LabelName>": (<num_gt>, <scores>, <tp_fp_labels>),
+                        ...
+                    }
+                }
+
+            where "AP_per_class" only contains the classes with ground truth
+            boxes in the image, whose AP is not NaN, and "class_stats" can be
+            added to a :class:`DatasetMetricsAccumulator`. If the evaluator
+            has slices, the dictionary also contains the "slice_stats" of
+            :func:`compute_slice_stats`.
+
+            If the evaluator has a list of IoU thresholds, a list with one
+            such dictionary per threshold is returned
+        """
+        if groundtruth is not self._groundtruth:
+            self._groundtruth = groundtruth
+            self._parsed_groundtruth = parse_groundtruth(
+                groundtruth, self._class_label_map
+            )
+
+        self.counts["images"] += 1
+        if is_trivial_image(self._parsed_groundtruth, predictions):
+            self.counts["fast_path_images"] += 1
+
+        records = match_image(
+            groundtruth,
+            predictions,
+            self._class_label_map,
+            get_iou_thresholds(self._iou_threshold),
+            parsed_groundtruth=self._parsed_groundtruth,
+        )
+        results = [
+            make_image_result(
+                thresh_records, predictions, self._reverse_label_map
+            )
+            for thresh_records in records
+        ]
+
+        if self._slices:
+            slice_values = get_slice_values(
+                groundtruth, predictions, self._slices
+            )
+            for result, thresh_records in zip(results, records):
+                result["slice_stats"] = compute_slice_stats(
+                    thresh_records,
+                    predictions,
+                    self._parsed_groundtruth,
+                    slice_values,
+                    self._reverse_label_map,
+                )
+
+        if np.isscalar(self._iou_threshold):
+            return results[0]
+
+        return results
+
+
+class DatasetMetricsAccumulator:
+    """Accumulates the per-class scores, true positive labels and ground truth
+    counts of evaluated images, from which the dataset-level Open Images
+    Challenge metrics can be computed without another pass over the images.
+    """
+
+    def __init__(self):
+        self._num_gt = defaultdict(int)
+        self._scores = defaultdict(list)
+        self._tp_fp_labels = defaultdict(list)
+
+    def add(self, class_stats):
+        """Adds the results of an image.
+
+        Args:
+            class_stats: the "class_stats" of an image evaluation result
+        """
+        for class_name, (num_gt, scores, tp_fp_labels) in class_stats.items():
+            self._num_gt[class_name] += num_gt
+            if len(scores) > 0:
+                self._scores[class_name].append(scores)
+                self._tp_fp_labels[class_name].append(tp_fp_labels)
+
+    def merge(self, other):
+        """Merges the images of another accumulator into this one, as if they
+        had been added after the images of this accumulator.
+
+        Args:
+            other: a :class:`DatasetMetricsAccumulator`
+        """
+        for class_name, num_gt in other._num_gt.items():
+            self._num_gt[class_name] += num_gt
+
+        for class_name, scores in other._scores.items():
+            self._scores[class_name].extend(scores)
+            self._tp_fp_labels[class_name].extend(
+                other._tp_fp_labels[class_name]
+            )
+
+    def compute_metrics(self):
+        """Computes the dataset-level metrics.
+
+        Returns:
+            a dictionary with structure:
+                {
+                    "mAP": <mAP>,
+                    "AP_per_class": {
+                        "<LabelName>": <AP>,
+                        ...
+                    }
+                }
+
+            where "AP_per_class" contains the classes with ground truth
+        """
+        ap_per_class = {}
+        for class_name in sorted(self._num_gt):
+            num_gt = self._num_gt[class_name]
+            if num_gt == 0:
+                continue
+
+            if self._scores[class_name]:
+                scores = np.concatenate(self._scores[class_name])
+                tp_fp_labels = np.concatenate(self._tp_fp_labels[class_name])
+            else:
+                scores = np.zeros(0)
+                tp_fp_labels = np.zeros(0)
+
+            precision, recall = compute_precision_recall(
+                scores, tp_fp_labels, num_gt
+            )
+            ap_per_class[class_name] = compute_average_precision(
+                precision, recall
+            )
+
+        if ap_per_class:
+            mAP = float(np.mean(list(ap_per_class.values())))
+        else:
+            mAP = np.nan
+
+        return {"mAP": mAP, "AP_per_class": ap_per_class}
+
+    def compute_counts(self):
+        """Computes the total numbers of true positives, false positives and
+        ground truth instances of all classes.
+
+        Returns:
+            a dictionary with keys "TP", "FP" and "num_gt"
+        """
+        num_tp = 0
+        num_dets = 0
+        for class_labels in self._tp_fp_labels.values():
+            for labels in class_labels:
+                num_tp += int(np.count_nonzero(labels > 0))
+                num_dets += len(labels)
+
+        return {
+            "TP": num_tp,
+            "FP": num_dets - num_tp,
+            "num_gt": int(sum(self._num_gt.values())),
+        }
+
+    def compute_pr_curves(self):
+        """Computes the dataset-level precision-recall curve of each class.
+
+        The predictions of all classes are sorted at once, and the curves are
+        computed with cumulative sums. Each point of a curve corresponds to a
+        distinct score threshold, i.e., predictions with equal scores are
+        added to the curve together.
+
+        Returns:
+            a dictionary mapping each class with ground truth to a dictionary
+            with structure:
+                {
+                    "thresholds": <(N,) decreasing score thresholds>,
+                    "precision": <(N,) precisions>,
+                    "recall": <(N,) recalls>,
+                    "AP": <AP>,
+                    "best_threshold": <F1-optimal threshold, or None>,
+                    "best_precision": <precision at best_threshold>,
+                    "best_recall": <recall at best_threshold>,
+                    "best_f1": <F1 score at best_threshold>,
+                }
+        """
+        ap_per_class = self.compute_metrics()["AP_per_class"]
+        class_names = list(ap_per_class.keys())
+
+        class_scores = [
+            np.concatenate(self._scores[n]) if self._scores[n] else []
+            for n in class_names
+        ]
+        class_labels = [
+            np.concatenate(self._tp_fp_labels[n]) if self._scores[n] else []
+            for n in class_names
+        ]
+        counts = np.array([len(scores) for scores in class_scores], dtype=int)
+        num_gts = np.array([self._num_gt[n] for n in class_names], dtype=float)
+
+        if counts.sum() > 0:
+            scores = np.concatenate(class_scores).astype(float)
+            labels = np.concatenate(class_labels).astype(float)
+        else:
+            scores = np.zeros(0)
+            labels = np.zeros(0)
+
+        class_idxs = np.repeat(np.arange(len(class_names)), counts)
+
+        # sort by class, then by decreasing score
+        order = np.lexsort((-scores, class_idxs))
+        scores = scores[order]
+        labels = labels[order]
+
+        # cumulative true/false positives within each class
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        cum_tp = np.cumsum(labels)
+        cum_fp = np.cumsum(1.0 - labels)
+        tp_before = np.concatenate([[0.0], cum_tp])[offsets]
+        fp_before = np.concatenate([[0.0], cum_fp])[offsets]
+        cum_tp -= np.repeat(tp_before, counts)
+        cum_fp -= np.repeat(fp_before, counts)
+
+        precision = cum_tp / np.maximum(cum_tp + cum_fp, 1.0)
+        recall = cum_tp / np.repeat(num_gts, counts)
+        denominator = precision + recall
+        f1 = np.divide(
+            2 * precision * recall,
+            denominator,
+            out=np.zeros_like(denominator),
+            where=denominator > 0,
+        )
+
+        # only keep the last prediction of each run of equal scores
+        is_last = np.ones(len(scores), dtype=bool)
+        if len(scores) > 0:
+            is_last[:-1] = (class_idxs[1:] != class_idxs[:-1]) | (
+                scores[1:] != scores[:-1]
+            )
+
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        curves = {}
+        for i, class_name in enumerate(class_names):
+            keep = bounds[i] + np.flatnonzero(
+                is_last[bounds[i] : bounds[i + 1]]
+            )
+            curve = {
+                "thresholds": scores[keep],
+                "precision": precision[keep],
+                "recall": recall[keep],
+                "AP": ap_per_class[class_name],
+                "best_threshold": None,
+                "best_precision": 0.0,
+                "best_recall": 0.0,
+                "best_f1": 0.0,
+            }
+
+            if len(keep) > 0:
+                best = keep[np.argmax(f1[keep])]
+                curve["best_threshold"] = float(scores[best])
+                curve["best_precision"] = float(precision[best])
+                curve["best_recall"] = float(recall[best])
+                curve["best_f1"] = float(f1[best])
+
+            curves[class_name] = curve
+
+        return curves
+
+
+class SlicedMetricsAccumulator:
+    """Accumulates the "slice_stats" of evaluated images, from which the
+    dataset-level metrics of each slice can be computed.
+    """
+
+    def __init__(self):
+        self._accumulators = defaultdict(DatasetMetricsAccumulator)
+
+    def add(self, slice_stats):
+        """Adds the results of an image.
+
+        Args:
+            slice_stats: the "slice_stats" of an image evaluation result
+        """
+        for attribute, value_stats in slice_stats.items():
+            for value, class_stats in value_stats.items():
+                self._accumulators[(attribute, value)].add(class_stats)
+
+    def merge(self, other):
+        """Merges the images of another accumulator into this one, as if they
+        had been added to this one after its own images.
+
+        Args:
+            other: a :class:`SlicedMetricsAccumulator`
+        """
+        for key, accumulator in other._accumulators.items():
+            self._accumulators[key].merge(accumulator)
+
+    def compute_metrics(self):
+        """Computes the dataset-level metrics of each slice.
+
+        Returns:
+            a dictionary with structure:
+                {
+                    "<attribute>": {
+                        <value>: {
+                            "mAP": <mAP>,
+                            "AP_per_class": {"<LabelName>": <AP>, ...},
+                            "TP": <number of true positives>,
+                            "FP": <number of false positives>,
+                            "num_gt": <number of ground truth instances>,
+                        },
+                        ...
+                    },
+                    ...
+                }
+        """
+        metrics = {}
+        for (attribute, value), accumulator in sorted(
+            self._accumulators.items(), key=lambda item: str(item[0])
+        ):
+            if value is None:
+                continue
+
+            # the predictions that count in every slice of the attribute
+            shared = self._accumulators.get((attribute, None), None)
+            if shared is not None:
+                merged = DatasetMetricsAccumulator()
+                merged.merge(accumulator)
+                merged.merge(shared)
+                accumulator = merged
+
+            value_metrics = accumulator.compute_metrics()
+            value_metrics.update(accumulator.compute_counts())
+            metrics.setdefault(attribute, {})[value] = value_metrics
+
+        return metrics
+
+
+def match_image(
+    groundtruth,
+    predictions,
+    class_label_map,
+    iou_thresholds,
+    parsed_groundtruth=None,
+):
+    """Matches the predictions of an image to its ground truth, class by
+    class, at one or more IoU thresholds.
+
+    The IoU and IoA matrices of each class are computed once and reused for
+    every threshold.
+
+    Args:
+        groundtruth: the ground truth pandas.DataFrame of the image
+        predictions: the predictions pandas.DataFrame of the image
+        class_label_map: a dict mapping class names to class IDs
+        iou_thresholds: a list of matching thresholds
+        parsed_groundtruth: the optional output of :func:`parse_groundtruth`
+            for ``groundtruth``, to avoid parsing it again
+
+    Returns:
+        a list with, for each threshold, a list with, for each evaluated
+        class, a tuple of
+
+        -   the class ID
+        -   the number of ground truth instances of the class
+        -   the scores to use to compute precision/recall
+        -   the corresponding float true positive labels
+        -   the positional row indexes in ``predictions`` of the predictions
+            of the class, in decreasing score order
+        -   the verdicts of these predictions, see :func:`match_detections`
+        -   the positional indexes in the located ground truth returned by
+            :func:`parse_groundtruth` of the boxes matched by these
+            predictions, or -1
+    """
+    if parsed_groundtruth is None:
+        parsed_groundtruth = parse_groundtruth(groundtruth, class_label_map)
+
+    if is_trivial_image(parsed_groundtruth, predictions):
+        return _match_trivial_image(
+            parsed_groundtruth, predictions, class_label_map, iou_thresholds
+        )
+
+    gt_boxes, gt_classes, gt_is_group_of, image_classes = parsed_groundtruth
+    det_boxes, det_scores, det_classes = _parse_predictions(
+        predictions, class_label_map
+    )
+
+    # only verified classes and classes with boxes are evaluated, and
+    # predictions with invalid boxes are dropped
+    evaluatable = np.union1d(image_classes, gt_classes)
+    det_rows = _get_valid_rows(det_boxes, det_classes, evaluatable)
+
+    records = [[] for _ in iou_thresholds]
+    for class_id in np.union1d(gt_classes, det_classes[det_rows]):
+        cls_rows = det_rows[det_classes[det_rows] == class_id]
+
+        # same (unstable) ordering as the TF evaluator, so that ties are
+        # broken identically
+        cls_rows = cls_rows[np.argsort(det_scores[cls_rows])[::-1]]
+        cls_boxes = det_boxes[cls_rows]
+        cls_scores = det_scores[cls_rows]
+
+        is_cls_gt = gt_classes == class_id
+        box_gt_rows = np.flatnonzero(is_cls_gt & ~gt_is_group_of)
+        group_gt_rows = np.flatnonzero(is_cls_gt & gt_is_group_of)
+        cls_gt_rows = np.concatenate([box_gt_rows, group_gt_rows])
+        box_gt = gt_boxes[box_gt_rows]
+        group_gt = gt_boxes[group_gt_rows]
+
+        iou = compute_iou(cls_boxes, box_gt)
+        ioa = compute_ioa(cls_boxes, group_gt)
+        num_gt = len(box_gt) + len(group_gt)
+
+        for iou_threshold, thresh_records in zip(iou_thresholds, records):
+            verdicts, pr_scores, pr_labels, matches = match_detections(
+                iou, ioa, cls_scores, iou_threshold
+            )
+
+            matched_gt = np.full(len(matches), -1)
+            is_matched = matches >= 0
+            matched_gt[is_matched] = cls_gt_rows[matches[is_matched]]
+
+            thresh_records.append(
+                (
+                    class_id,
+                    num_gt,
+                    pr_scores,
+                    pr_labels,
+                    cls_rows,
+                    verdicts,
+                    matched_gt,
+                )
+            )
+
+    return records
+
+
+def is_trivial_image(parsed_groundtruth, predictions):
+    """Returns whether an image has no predictions or no located ground
+    truth, in which case its results do not depend on any matching.
+
+    Args:
+        parsed_groundtruth: the output of :func:`parse_groundtruth` for the
+            ground truth of the image
+        predictions: the predictions pandas.DataFrame of the image
+
+    Returns:
+        True/False
+    """
+    return len(predictions) == 0 or len(parsed_groundtruth[0]) == 0
+
+
+def make_image_result(records, predictions, reverse_label_map):
+    """Computes the per-image evaluation results from the match records of
+    one threshold.
+
+    Args:
+        records: the records of one threshold generated by
+            :func:`match_image`
+        predictions: the predictions pandas.DataFrame of the image
+        reverse_label_map: a dict mapping class IDs to class names
+
+    Returns:
+        a dictionary with the structure returned by
+        :meth:`NumpyObjectDetectionEvaluator.evaluate_image`
+    """
+    true_positive_idxs, false_positive_idxs = get_TP_FP_indexes(
+        records, predictions
+    )
+
+    ap_per_class = {}
+    class_stats = {}
+    for class_id, num_gt, pr_scores, pr_labels, _, _, _ in records:
+        class_name = reverse_label_map[class_id]
+        class_stats[class_name] = (num_gt, pr_scores, pr_labels)
+
+        if num_gt > 0:
+            precision, recall = compute_precision_recall(
+                pr_scores, pr_labels, num_gt
+            )
+            ap_per_class[class_name] = compute_average_precision(
+                precision, recall
+            )
+
+    if ap_per_class:
+        mAP = float(np.mean(list(ap_per_class.values())))
+    else:
+        mAP = np.nan
+
+    return {
+        "true_positive_indexes": true_positive_idxs,
+        "false_positive_indexes": false_positive_idxs,
+        "mAP": mAP,
+        "AP_per_class": ap_per_class,
+        "class_stats": class_stats,
+    }
+
+
+def get_slice_values(groundtruth, predictions, slices):
+    """Gets the values of the slicing attributes of the located ground truth
+    and, for box sizes, of the predictions of an image.
+
+    Args:
+        groundtruth: the ground truth pandas.DataFrame of the image
+        predictions: the predictions pandas.DataFrame of the image
+        slices: a list of :const:`SLICE_ATTRIBUTES`
+
+    Returns:
+        a dict mapping each attribute to a tuple of the values of the located
+        ground truth, in the order of :func:`parse_groundtruth`, and the
+        values of the predictions, or None if the attribute only applies to
+        the ground truth
+    """
+    is_box = _get_notnull(groundtruth, "XMin")
+
+    slice_values = {}
+    for attribute in slices:
+        if attribute == BOX_SIZE:
+            rows = np.ones(len(predictions), dtype=bool)
+            gt_values = _get_box_sizes(_get_boxes(groundtruth, is_box))
+            det_values = _get_box_sizes(_get_boxes(predictions, rows))
+        else:
+            gt_values = groundtruth[attribute].to_numpy()[is_box]
+            det_values = None
+
+            # the attributes of the located ground truth are integers, which
+            # the rows of the image labels turn into floats. Missing values
+            # stay missing
+            if gt_values.dtype.kind == "f":
+                is_missing = np.isnan(gt_values)
+                int_values = np.where(is_missing, 0, gt_values).astype(int)
+                gt_values = int_values.astype(object)
+                gt_values[is_missing] = None
+
+        slice_values[attribute] = (gt_values, det_values)
+
+    return slice_values
+
+
+def compute_slice_stats(
+    records, predictions, parsed_groundtruth, slice_values, reverse_label_map
+):
+    """Splits the "class_stats" of an image by the values of the attributes
+    of its located ground truth.
+
+    The slice of an attribute value contains the ground truth instances with
+    that value and the true positives that matched them. Predictions that
+    matched no ground truth have no attribute value, so these false positives
+    count in every slice of the attribute, except for box sizes, for which
+    they count in the slice of their own size. Ignored predictions are in no
+    slice. Ground truth whose attribute value is missing, e.g. a ``None``
+    source, is in the :const:`MISSING_SLICE_VALUE` slice.
+
+    Args:
+        records: the records of one threshold generated by
+            :func:`match_image`
+        predictions: the predictions pandas.DataFrame of the image
+        parsed_groundtruth: the output of :func:`parse_groundtruth` for the
+            ground truth of the image
+        slice_values: the output of :func:`get_slice_values` for the image
+        reverse_label_map: a dict mapping class IDs to class names
+
+    Returns:
+        a dict mapping each attribute to a dict mapping its values to
+        "class_stats", in which the stats of the predictions that count in
+        every slice of the attribute are keyed by None. It can be added to a
+        :class:`SlicedMetricsAccumulator`
+    """
+    gt_classes = parsed_groundtruth[1]
+    det_scores = predictions["Score"].to_numpy(dtype=float)
+
+    # the predictions of all classes are sliced at once
+    classes = [np.zeros(0, dtype=int)]
+    rows = [np.zeros(0, dtype=int)]
+    verdicts = [np.zeros(0, dtype=int)]
+    matched_gt = [np.zeros(0, dtype=int)]
+    for class_id, _, _, _, cls_rows, cls_verdicts, cls_matched_gt in records:
+        classes.append(np.full(len(cls_rows), class_id))
+        rows.append(cls_rows)
+        verdicts.append(cls_verdicts)
+        matched_gt.append(cls_matched_gt)
+
+    classes = np.concatenate(classes)
+    rows = np.concatenate(rows)
+    verdicts = np.concatenate(verdicts)
+    matched_gt = np.concatenate(matched_gt)
+
+    keep = verdicts != IGNORED
+    classes = classes[keep]
+    rows = rows[keep]
+    matched_gt = matched_gt[keep]
+    is_tp = verdicts[keep] == TRUE_POSITIVE
+    scores = det_scores[rows]
+    labels = is_tp.astype(float)
+
+    slice_stats = {}
+    for attribute, (gt_values, det_values) in slice_values.items():
+        if det_values is None:
+            gt_codes, values = pd.factorize(gt_values, sort=True)
+            fp_codes = np.full(len(rows), -1)
+        else:
+            codes, values = pd.factorize(
+                np.concatenate([gt_values, det_values]), sort=True
+            )
+            gt_codes = codes[: len(gt_values)]
+            fp_codes = codes[len(gt_values) :][rows]
+
+        # factorize() codes missing values as -1, which is reserved for the
+        # predictions in every slice
+        values = values.tolist()
+        is_missing = gt_codes < 0
+        if is_missing.any():
+            gt_codes = np.where(is_missing, len(values), gt_codes)
+            values.append(MISSING_SLICE_VALUE)
+
+        # the slice of each prediction, or -1 for every slice
+        det_codes = fp_codes
+        det_codes[is_tp] = gt_codes[matched_gt[is_tp]]
+
+        value_stats = {}
+        for code, value in enumerate(values):
+            in_slice = det_codes == code
+            value_stats[value] = _group_class_stats(
+                classes[in_slice],
+                scores[in_slice],
+                labels[in_slice],
+                gt_classes[gt_codes == code],
+                reverse_label_map,
+            )
+
+        in_every_slice = det_codes == -1
+        if in_every_slice.any():
+            value_stats[None] = _group_class_stats(
+                classes[in_every_slice],
+                scores[in_every_slice],
+                labels[in_every_slice],
+                np.zeros(0, dtype=int),
+                reverse_label_map,
+            )
+
+        slice_stats[attribute] = value_stats
+
+    return slice_stats
+
+
+def parse_groundtruth(groundtruth, class_label_map):
+    """Parses the ground truth of an image into the arrays that
+    :func:`match_image` matches predictions against.
+
+    Args:
+        groundtruth: the ground truth pandas.DataFrame of the image
+        class_label_map: a dict mapping class names to class IDs
+
+    Returns:
+        a tuple of the boxes, class IDs and group-of flags of the located
+        ground truth, and the class IDs of the verified image labels
+    """
+    is_box = _get_notnull(groundtruth, "XMin")
+    is_label = _get_notnull(groundtruth, "ConfidenceImageLabel")
+
+    gt_boxes = _get_boxes(groundtruth, is_box)
+    gt_classes = _get_class_ids(groundtruth, is_box, class_label_map)
+    if "IsGroupOf" in groundtruth:
+        gt_is_group_of = (
+            groundtruth["IsGroupOf"].to_numpy()[is_box].astype(int) != 0
+        )
+    else:
+        gt_is_group_of = np.zeros(len(gt_boxes), dtype=bool)
+
+    image_classes = _get_class_ids(groundtruth, is_label, class_label_map)
+
+    return gt_boxes, gt_classes, gt_is_group_of, image_classes
+
+
+def get_TP_FP_indexes(records, predictions):
+    """Gathers the true positive and false positive predictions of an image.
+
+    Args:
+        records: the records of one threshold generated by
+            :func:`match_image`
+        predictions: the predictions pandas.DataFrame of the image
+
+    Returns:
+        true_positive_idxs, false_positive_idxs: lists of the index labels of
+        the true positive and false positive rows of ``predictions``
+    """
+    true_positive_idxs = []
+    false_positive_idxs = []
+
+    index = predictions.index.to_numpy()
+    for _, _, _, _, rows, verdicts, _ in records:
+        true_positive_idxs.extend(
+            index[rows[verdicts == TRUE_POSITIVE]].tolist()
+        )
+        false_positive_idxs.extend(
+            index[rows[verdicts == FALSE_POSITIVE]].tolist()
+        )
+
+    return true_positive_idxs, false_positive_idxs
+
+
+def get_iou_thresholds(iou_threshold):
+    """Returns the list of IoU thresholds of an ``iou_threshold`` argument,
+    which is either a single threshold or a list of thresholds.
+    """
+    if np.isscalar(iou_threshold):
+        return [iou_threshold]
+
+    return list(iou_threshold)
+
+
+def get_threshold_suffix(iou_threshold):
+    """Returns the suffix of the names of the fields in which the results at
+    an IoU threshold are stored when evaluating at several thresholds, e.g.
+    ``"_50"`` for 0.5.
+    """
+    return "_%d" % round(100 * iou_threshold)
+
+
+def match_detections(iou, ioa, scores, iou_threshold):
+    """Matches the predictions of one class in one image to its ground truth.
+
+    Each prediction, in decreasing score order, is a true positive if its
+    highest-IoU non-group-of box has IoU >= ``iou_threshold`` and has not been
+    matched by a higher scoring prediction, and a false positive otherwise,
+    unless it has IoA >= ``iou_threshold`` with a group-of box. Such
+    predictions are ignored, except that the highest scoring prediction of
+    each group-of box is a true positive.
+
+    Args:
+        iou: a (N, M) array of IoUs between the N predictions, in decreasing
+            score order, and the M non-group-of ground truth boxes
+        ioa: a (N, G) array of the intersections of the N predictions with the
+            G group-of ground truth boxes divided by the prediction areas
+        scores: a (N,) array of prediction scores, in decreasing order
+        iou_threshold: the matching threshold
+
+    Returns:
+        a tuple of
+
+        -   a (N,) array of :const:`TRUE_POSITIVE`, :const:`FALSE_POSITIVE` or
+            :const:`IGNORED` verdicts
+        -   the scores to use to compute precision/recall, i.e. the scores of
+            the non-ignored predictions followed by the scores of the matched
+            group-of boxes
+        -   the corresponding float true positive labels
+        -   a (N,) array of the indexes of the boxes matched by the
+            predictions, in the concatenation of the M non-group-of and G
+            group-of boxes, or -1 for false positives
+    """
+    num_dets = len(scores)
+    rows = np.arange(num_dets)
+    is_tp = np.zeros(num_dets, dtype=bool)
+    is_grouped = np.zeros(num_dets, dtype=bool)
+    group_reps = np.zeros(0, dtype=int)
+    matches = np.full(num_dets, -1)
+
+    if iou.shape[1] > 0:
+        best = np.argmax(iou, axis=1)
+        candidates = np.flatnonzero(iou[rows, best] >= iou_threshold)
+
+        # the first candidate of each box is a match, later ones are
+        # duplicates
+        _, first = np.unique(best[candidates], return_index=True)
+        is_tp[candidates[first]] = True
+        matches[is_tp] = best[is_tp]
+
+    if ioa.shape[1] > 0:
+        best = np.argmax(ioa, axis=1)
+        is_grouped = ~is_tp & (ioa[rows, best] >= iou_threshold)
+        matches[is_grouped] = iou.shape[1] + best[is_grouped]
+        candidates = np.flatnonzero(is_grouped)
+
+        # the first (highest scoring) prediction of each group-of box
+        # represents it, unless its score is not positive
+        _, first = np.unique(best[candidates], return_index=True)
+        group_reps = candidates[first]
+        group_reps = group_reps[scores[group_reps] > 0]
+
+    verdicts = np.where(is_tp, TRUE_POSITIVE, FALSE_POSITIVE)
+    verdicts[is_grouped] = IGNORED
+    verdicts[group_reps] = TRUE_POSITIVE
+
+    pr_scores = np.concatenate([scores[~is_grouped], scores[group_reps]])
+    pr_labels = np.concatenate(
+        [is_tp[~is_grouped].astype(float), np.ones(len(group_reps))]
+    )
+
+    return verdicts, pr_scores, pr_labels, matches
+
+
+def compute_iou(boxes1, boxes2):
+    """Computes the pairwise intersection-over-union of two sets of boxes.
+
+    Args:
+        boxes1: a (N, 4) array of [ymin, xmin, ymax, xmax] boxes
+        boxes2: a (M, 4) array of [ymin, xmin, ymax, xmax] boxes
+
+    Returns:
+        a (N, M) array
+    """
+    intersection = _compute_intersection(boxes1, boxes2)
+    union = (
+        _compute_area(boxes1)[:, np.newaxis]
+        + _compute_area(boxes2)[np.newaxis, :]
+        - intersection
+    )
+    return intersection / union
+
+
+def compute_ioa(boxes1, boxes2):
+    """Computes the pairwise intersection of two sets of boxes divided by the
+    areas of the first set.
+
+    Args:
+        boxes1: a (N, 4) array of [ymin, xmin, ymax, xmax] boxes
+        boxes2: a (M, 4) array of [ymin, xmin, ymax, xmax] boxes
+
+    Returns:
+        a (N, M) array
+    """
+    intersection = _compute_intersection(boxes1, boxes2)
+    return intersection / _compute_area(boxes1)[:, np.newaxis]
+
+
+def compute_precision_recall(scores, labels, num_gt):
+    """Computes the precision and recall curves of scored predictions.
+
+    Args:
+        scores: a (N,) array of prediction scores
+        labels: a (N,) float or bool array of true positive labels
+        num_gt: the number of ground truth instances
+
+    Returns:
+        a tuple of (N,) precision and recall arrays, sorted by decreasing
+        score, or ``(None, None)`` if ``num_gt`` is zero
+    """
+    if num_gt == 0:
+        return None, None
+
+    sorted_indices = np.argsort(scores)[::-1]
+    true_positive_labels = labels[sorted_indices].astype(float)
+    false_positive_labels = (true_positive_labels <= 0).astype(float)
+    cum_true_positives = np.cumsum(true_positive_labels)
+    cum_false_positives = np.cumsum(false_positive_labels)
+    precision = cum_true_positives / (cum_true_positives + cum_false_positives)
+    recall = cum_true_positives / num_gt
+    return precision, recall
+
+
+def compute_average_precision(precision, recall):
+    """Computes the average precision as the area under the interpolated
+    (monotonically decreasing) precision-recall curve.
+
+    Args:
+        precision: a (N,) array of precisions, or None
+        recall: a (N,) array of recalls, or None
+
+    Returns:
+        the average precision, which is NaN if ``precision`` is None and zero
+        if it is empty
+    """
+    if precision is None:
+        return np.nan
+
+    if precision.size == 0:
+        return 0.0
+
+    recall = np.concatenate([[0], recall, [1]])
+    precision = np.concatenate([[0], precision, [0]])
+
+    # interpolate precision as the max precision at any higher recall
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+
+    indices = np.flatnonzero(recall[1:] != recall[:-1]) + 1
+    return float(
+        np.sum((recall[indices] - recall[indices - 1]) * precision[indices])
+    )
+
+
+def _match_trivial_image(
+    parsed_groundtruth, predictions, class_label_map, iou_thresholds
+):
+    _, gt_classes, _, image_classes = parsed_groundtruth
+
+    records = []
+    if len(predictions) == 0:
+        # every class with ground truth boxes is entirely missed
+        class_ids, num_gts = np.unique(gt_classes, return_counts=True)
+        no_scores = np.zeros(0)
+        no_rows = np.zeros(0, dtype=int)
+        for class_id, num_gt in zip(class_ids, num_gts):
+            records.append(
+                (
+                    class_id,
+                    int(num_gt),
+                    no_scores,
+                    no_scores,
+                    no_rows,
+                    no_rows,
+                    no_rows,
+                )
+            )
+    else:
+        # without located ground truth, the predictions of the verified
+        # classes are false positives and the others are ignored
+        det_boxes, det_scores, det_classes = _parse_predictions(
+            predictions, class_label_map
+        )
+        det_rows = _get_valid_rows(det_boxes, det_classes, image_classes)
+        for class_id in np.unique(det_classes[det_rows]):
+            cls_rows = det_rows[det_classes[det_rows] == class_id]
+            cls_rows = cls_rows[np.argsort(det_scores[cls_rows])[::-1]]
+            num_dets = len(cls_rows)
+            records.append(
+                (
+                    class_id,
+                    0,
+                    det_scores[cls_rows],
+                    np.zeros(num_dets),
+                    cls_rows,
+                    np.full(num_dets, FALSE_POSITIVE),
+                    np.full(num_dets, -1),
+                )
+            )
+
+    # the records are the same at every threshold
+    return [records for _ in iou_thresholds]
+
+
+def _get_box_sizes(boxes):
+    idxs = np.searchsorted(BOX_SIZE_EDGES, _compute_area(boxes), side="right")
+    return np.array(BOX_SIZE_NAMES, dtype=object)[idxs]
+
+
+def _group_class_stats(classes, scores, labels, gt_classes, reverse_label_map):
+    gt_class_ids, num_gts = np.unique(gt_classes, return_counts=True)
+    num_gt_map = dict(zip(gt_class_ids.tolist(), num_gts.tolist()))
+
+    class_stats = {}
+    for class_id in np.union1d(gt_class_ids, classes).tolist():
+        in_class = classes == class_id
+        class_stats[reverse_label_map[class_id]] = (
+            num_gt_map.get(class_id, 0),
+            scores[in_class],
+            labels[in_class],
+        )
+
+    return class_stats
+
+
+def _get_valid_rows(det_boxes, det_classes, evaluatable):
+    valid = (
+        np.isin(det_classes, evaluatable)
+        & (det_boxes[:, 0] < det_boxes[:, 2])
+        & (det_boxes[:, 1] < det_boxes[:, 3])
+    )
+    return np.flatnonzero(valid)
+
+
+def _parse_predictions(predictions, class_label_map):
+    rows = np.ones(len(predictions), dtype=bool)
+    det_boxes = _get_boxes(predictions, rows)
+    det_scores = predictions["Score"].to_numpy(dtype=float)
+    det_classes = _get_class_ids(predictions, rows, class_label_map)
+    return det_boxes, det_scores, det_classes
+
+
+def _get_notnull(df, column):
+    if column not in df:
+        return np.zeros(len(df), dtype=bool)
+
+    return df[column].notnull().to_numpy()
+
+
+def _get_class_ids(df, rows, class_label_map):
+    if not rows.any():
+        return np.zeros(0, dtype=int)
+
+    return np.array(
+        [class_label_map[label] for label in df["LabelName"].to_numpy()[rows]],
+        dtype=int,
+    )
+
+
+def _get_boxes(df, rows):
+    if not rows.any():
+        return np.zeros((0, 4))
+
+    return np.stack(
+        [df[column].to_numpy(dtype=float)[rows] for column in _BOX_COLUMNS],
+        axis=1,
+    )
+
+
+def _compute_area(boxes):
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def _compute_intersection(boxes1, boxes2):
+    boxes1 = boxes1[:, np.newaxis, :]
+    boxes2 = boxes2[np.newaxis, :, :]
+
+    mins = np.maximum(boxes1[..., :2], boxes2[..., :2])
+    maxs = np.minimum(boxes1[..., 2:], boxes2[..., 2:])
+    sizes = np.maximum(0.0, maxs - mins)
+    return sizes[..., 0] * sizes[..., 1]
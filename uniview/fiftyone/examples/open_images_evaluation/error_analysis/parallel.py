@@ -0,0 +1,40 @@
+"""
+Utilities for running tasks in worker processes.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+
+def iter_map(fcn, args, num_workers):
+    """Calls a function on each tuple of arguments in worker processes and
+    yields the results in order.
+
+    Only ``2 * num_workers`` calls are in flight at a time, so that memory
+    usage stays bounded however many calls there are. The workers are
+    spawned, since the database client of this process must not be shared
+    with forked processes, so ``fcn`` and its arguments must be picklable.
+
+    Args:
+        fcn: a module-level function
+        args: an iterable of tuples of arguments for ``fcn``
+        num_workers: the number of worker processes
+
+    Returns:
+        a generator of the return values of ``fcn``
+    """
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        pending = deque()
+        for cur_args in args:
+            pending.append(executor.submit(fcn, *cur_args))
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,256 @@
+"""
+Utilities for generating synthetic Open Images format datasets, e.g. for
+benchmarking the loaders and evaluators at scale without downloading the real
+dataset.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+
+BOUNDING_BOXES_FILENAME = "bounding_boxes.csv"
+IMAGE_LABELS_FILENAME = "image_labels.csv"
+PREDICTIONS_FILENAME = "predictions.csv"
+CLASS_DESCRIPTIONS_FILENAME = "class_descriptions.csv"
+LABEL_MAP_FILENAME = "label_map.pbtxt"
+IMAGES_DIRNAME = "images"
+
+
+def make_synthetic_open_images(
+    output_dir,
+    num_images=1000,
+    boxes_per_image=10,
+    labels_per_image=5,
+    predictions_per_image=20,
+    num_classes=600,
+    write_images=True,
+    seed=0,
+    chunk_size=10000,
+):
+    """Writes a synthetic Open Images format dataset to disk.
+
+    The following files are written to ``output_dir``:
+
+        bounding_boxes.csv      expanded-hierarchy bounding boxes
+        image_labels.csv        expanded-hierarchy image labels
+        predictions.csv         TF Object Detection API format predictions
+        class_descriptions.csv  MID to display name mapping
+        label_map.pbtxt         label map of the classes
+        images/                 one tiny <open-images-id>.jpg per image
+
+    All CSVs are sorted by ImageID, like the official ones. Predictions are
+    jittered copies of the ground truth boxes, some of which are given a
+    random label, so that they contain a realistic mix of true and false
+    positives. The CSVs are generated ``chunk_size`` images at a time, so
+    memory usage does not depend on ``num_images``.
+
+    Args:
+        output_dir: the directory to write to
+        num_images: the number of images
+        boxes_per_image: the number of ground truth boxes per image
+        labels_per_image: the number of verified image labels per image
+        predictions_per_image: the number of predicted boxes per image
+        num_classes: the number of classes
+        write_images: whether to write the images
+        seed: the random seed
+        chunk_size: the number of images to generate at a time
+
+    Returns:
+        a dict mapping the keys ``bounding_boxes_path``,
+        ``image_labels_path``, ``predictions_path``,
+        ``class_descriptions_path``, ``label_map_path`` and ``images_dir`` to
+        the corresponding paths
+    """
+    rng = np.random.default_rng(seed)
+
+    paths = {
+        "bounding_boxes_path": os.path.join(
+            output_dir, BOUNDING_BOXES_FILENAME
+        ),
+        "image_labels_path": os.path.join(output_dir, IMAGE_LABELS_FILENAME),
+        "predictions_path": os.path.join(output_dir, PREDICTIONS_FILENAME),
+        "class_descriptions_path": os.path.join(
+            output_dir, CLASS_DESCRIPTIONS_FILENAME
+        ),
+        "label_map_path": os.path.join(output_dir, LABEL_MAP_FILENAME),
+        "images_dir": os.path.join(output_dir, IMAGES_DIRNAME),
+    }
+    os.makedirs(paths["images_dir"], exist_ok=True)
+
+    mids = np.array(["/m/syn%04d" % i for i in range(num_classes)])
+    display_names = ["Synthetic class %d" % i for i in range(num_classes)]
+    _write_class_descriptions(
+        paths["class_descriptions_path"], mids, display_names
+    )
+    _write_label_map(paths["label_map_path"], mids, display_names)
+
+    image_ids = _make_image_ids(rng, num_images)
+
+    jpeg_bytes = _make_tiny_jpeg() if write_images else None
+
+    for i in range(0, num_images, chunk_size):
+        chunk_ids = image_ids[i : i + chunk_size]
+        header = i == 0
+
+        boxes = _make_boxes(rng, chunk_ids, boxes_per_image, mids)
+        boxes.to_csv(
+            paths["bounding_boxes_path"],
+            mode="w" if header else "a",
+            header=header,
+            index=False,
+            float_format="%.6f",
+        )
+
+        labels = _make_image_labels(rng, chunk_ids, labels_per_image, mids)
+        labels.to_csv(
+            paths["image_labels_path"],
+            mode="w" if header else "a",
+            header=header,
+            index=False,
+        )
+
+        predictions = _make_predictions(
+            rng, chunk_ids, boxes, boxes_per_image, predictions_per_image, mids
+        )
+        predictions.to_csv(
+            paths["predictions_path"],
+            mode="w" if header else "a",
+            header=header,
+            index=False,
+            float_format="%.6f",
+        )
+
+        if write_images:
+            for image_id in chunk_ids:
+                image_path = os.path.join(
+                    paths["images_dir"], image_id + ".jpg"
+                )
+                with open(image_path, "wb") as f:
+                    f.write(jpeg_bytes)
+
+    return paths
+
+
+def _make_image_ids(rng, num_images):
+    # unique, sorted 16 character hex IDs like the real ones
+    ids = set()
+    while len(ids) < num_images:
+        ids.update(
+            rng.integers(0, 2 ** 63, num_images - len(ids), dtype=np.int64)
+        )
+
+    return ["%016x" % i for i in sorted(ids)]
+
+
+def _make_boxes(rng, image_ids, boxes_per_image, mids):
+    n = len(image_ids) * boxes_per_image
+    xmin, xmax = _make_intervals(rng, n)
+    ymin, ymax = _make_intervals(rng, n)
+    flags = rng.random((n, 5)) < [0.5, 0.3, 0.05, 0.05, 0.05]
+
+    return pd.DataFrame(
+        {
+            "ImageID": np.repeat(image_ids, boxes_per_image),
+            "Source": "xclick",
+            "LabelName": mids[rng.integers(0, len(mids), n)],
+            "Confidence": 1,
+            "XMin": xmin,
+            "XMax": xmax,
+            "YMin": ymin,
+            "YMax": ymax,
+            "IsOccluded": flags[:, 0].astype(int),
+            "IsTruncated": flags[:, 1].astype(int),
+            "IsGroupOf": flags[:, 2].astype(int),
+            "IsDepiction": flags[:, 3].astype(int),
+            "IsInside": flags[:, 4].astype(int),
+        }
+    )
+
+
+def _make_image_labels(rng, image_ids, labels_per_image, mids):
+    n = len(image_ids) * labels_per_image
+    return pd.DataFrame(
+        {
+            "ImageID": np.repeat(image_ids, labels_per_image),
+            "Source": "verification",
+            "LabelName": mids[rng.integers(0, len(mids), n)],
+            "Confidence": rng.integers(0, 2, n),
+        }
+    )
+
+
+def _make_predictions(
+    rng, image_ids, boxes, boxes_per_image, predictions_per_image, mids
+):
+    num_images = len(image_ids)
+    n = num_images * predictions_per_image
+
+    if boxes_per_image > 0:
+        # the j-th prediction of an image is a jittered copy of its
+        # (j % boxes_per_image)-th ground truth box
+        offsets = np.arange(predictions_per_image) % boxes_per_image
+        src = np.repeat(
+            np.arange(num_images) * boxes_per_image, len(offsets)
+        ) + np.tile(offsets, num_images)
+        coords = boxes[["XMin", "XMax", "YMin", "YMax"]].to_numpy()[src]
+        coords = np.clip(coords + rng.normal(0, 0.03, coords.shape), 0, 1)
+        labels = boxes["LabelName"].to_numpy()[src]
+    else:
+        xmin, xmax = _make_intervals(rng, n)
+        ymin, ymax = _make_intervals(rng, n)
+        coords = np.stack([xmin, xmax, ymin, ymax], axis=1)
+        labels = mids[rng.integers(0, len(mids), n)]
+
+    # relabel some predictions so that they are false positives
+    relabel = rng.random(n) < 0.3
+    labels = np.where(relabel, mids[rng.integers(0, len(mids), n)], labels)
+
+    xmin = np.minimum(coords[:, 0], coords[:, 1])
+    xmax = np.maximum(coords[:, 0], coords[:, 1])
+    ymin = np.minimum(coords[:, 2], coords[:, 3])
+    ymax = np.maximum(coords[:, 2], coords[:, 3])
+
+    return pd.DataFrame(
+        {
+            "ImageID": np.repeat(image_ids, predictions_per_image),
+            "LabelName": labels,
+            "Score": rng.random(n),
+            "XMin": xmin,
+            "XMax": xmax,
+            "YMin": ymin,
+            "YMax": ymax,
+        }
+    )
+
+
+def _make_intervals(rng, n):
+    a = rng.random(n)
+    b = rng.random(n)
+    return np.minimum(a, b), np.maximum(a, b)
+
+
+def _make_tiny_jpeg():
+    with io.BytesIO() as f:
+        Image.new("RGB", (8, 8), color=(127, 127, 127)).save(f, "JPEG")
+        return f.getvalue()
+
+
+def _write_class_descriptions(path, mids, display_names):
+    pd.DataFrame({"mid": mids, "name": display_names}).to_csv(
+        path, header=False, index=False
+    )
+
+
+def _write_label_map(path, mids, display_names):
+    with open(path, "w") as f:
+        for idx, (mid, display_name) in enumerate(zip(mids, display_names), 1):
+            f.write(
+                'item {\n  name: "%s"\n  id: %d\n  display_name: "%s"\n}\n'
+                % (mid, idx, display_name)
+            )
@@ -0,0 +1,285 @@
+"""
+Script for benchmarking the Open Images loading and conversion utilities on
+synthetic data.
+
+For each requested dataset size, a synthetic Open Images format dataset is
+generated and the following are timed:
+
+    - load_open_images_dataset
+    - add_open_images_predictions
+    - df2detections
+    - detections2df
+
+The throughput and peak memory of each are reported. No network or GPU is
+required.
+
+Copyright 2017-2021, Voxel51, Inc.
+voxel51.com
+"""
+import argparse
+from pathlib import Path
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import fiftyone as fo
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from error_analysis.load_data import (
+    ANNOTATION_DTYPES,
+    GT_DETECTIONS,
+    OPEN_IMAGES_ID,
+    add_open_images_predictions,
+    detections2df,
+    df2detections,
+    load_open_images_dataset,
+)
+from error_analysis.synthetic import make_synthetic_open_images
+
+
+_ROW_FORMAT = "%-28s %10s %12s %10s %14s %12s %12s"
+
+
+def main(
+    num_images,
+    boxes_per_image,
+    labels_per_image,
+    predictions_per_image,
+    num_classes,
+    data_dir=None,
+    keep_data=False,
+    trace_memory=False,
+    streaming=False,
+    num_workers=None,
+    batch_size=1000,
+):
+    is_temp_dir = data_dir is None
+    if is_temp_dir:
+        data_dir = tempfile.mkdtemp(prefix="open-images-benchmark-")
+
+    print(
+        _ROW_FORMAT
+        % (
+            "stage",
+            "images",
+            "items",
+            "seconds",
+            "items/second",
+            "peak (MB)",
+            "max RSS (MB)",
+        )
+    )
+
+    for cur_num_images in num_images:
+        run_dir = str(Path(data_dir).joinpath("%d" % cur_num_images))
+        paths = _run_stage(
+            "generate data",
+            cur_num_images,
+            cur_num_images,
+            lambda: make_synthetic_open_images(
+                run_dir,
+                num_images=cur_num_images,
+                boxes_per_image=boxes_per_image,
+                labels_per_image=labels_per_image,
+                predictions_per_image=predictions_per_image,
+                num_classes=num_classes,
+            ),
+            trace_memory,
+        )
+
+        dataset_name = "open-images-benchmark-%d" % cur_num_images
+        if fo.dataset_exists(dataset_name):
+            fo.load_dataset(dataset_name).delete()
+
+        dataset = _run_stage(
+            "load_open_images_dataset",
+            cur_num_images,
+            cur_num_images,
+            lambda: load_open_images_dataset(
+                dataset_name,
+                paths["images_dir"],
+                bounding_boxes_path=paths["bounding_boxes_path"],
+                image_labels_path=paths["image_labels_path"],
+                class_descriptions_path=paths["class_descriptions_path"],
+                streaming=streaming,
+                batch_size=batch_size,
+                num_workers=num_workers,
+            ),
+            trace_memory,
+        )
+
+        _run_stage(
+            "add_open_images_predictions",
+            cur_num_images,
+            cur_num_images * predictions_per_image,
+            lambda: add_open_images_predictions(
+                dataset,
+                paths["predictions_path"],
+                class_descriptions_path=paths["class_descriptions_path"],
+                batch_size=batch_size,
+            ),
+            trace_memory,
+        )
+
+        boxes = pd.read_csv(
+            paths["bounding_boxes_path"], dtype=ANNOTATION_DTYPES
+        )
+        groups = [df for _, df in boxes.groupby("ImageID", sort=False)]
+        boxes = None
+
+        _run_stage(
+            "df2detections",
+            cur_num_images,
+            cur_num_images * boxes_per_image,
+            lambda: [df2detections(df) for df in groups],
+            trace_memory,
+        )
+        groups = None
+
+        image_ids = dataset.values(OPEN_IMAGES_ID)
+        detections = dataset.values(GT_DETECTIONS)
+
+        _run_stage(
+            "detections2df",
+            cur_num_images,
+            cur_num_images * boxes_per_image,
+            lambda: [
+                detections2df(image_id, dets, is_groundtruth=True)
+                for image_id, dets in zip(image_ids, detections)
+            ],
+            trace_memory,
+        )
+        image_ids = detections = None
+
+        dataset.delete()
+
+        if not keep_data:
+            shutil.rmtree(run_dir)
+
+    if is_temp_dir and not keep_data:
+        shutil.rmtree(data_dir)
+
+
+def _run_stage(name, num_images, num_items, fcn, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    result = fcn()
+    elapsed = time.perf_counter() - start
+
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = "%.1f" % (peak / 2 ** 20)
+    else:
+        peak = "-"
+
+    print(
+        _ROW_FORMAT
+        % (
+            name,
+            num_images,
+            num_items,
+            "%.2f" % elapsed,
+            "%.1f" % (num_items / max(elapsed, 1e-9)),
+            peak,
+            "%.1f" % _get_max_rss_mb(),
+        )
+    )
+
+    return result
+
+
+def _get_max_rss_mb():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # bytes on macOS, kilobytes elsewhere
+    if sys.platform == "darwin":
+        return max_rss / 2 ** 20
+
+    return max_rss / 2 ** 10
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--num_images",
+        nargs="+",
+        type=int,
+        default=[1000, 10000],
+        help="The dataset size(s) to benchmark. Use several sizes to check"
+        " how the timings scale.",
+    )
+    parser.add_argument(
+        "--boxes_per_image",
+        type=int,
+        default=10,
+        help="Number of ground truth boxes per image.",
+    )
+    parser.add_argument(
+        "--labels_per_image",
+        type=int,
+        default=5,
+        help="Number of verified image labels per image.",
+    )
+    parser.add_argument(
+        "--predictions_per_image",
+        type=int,
+        default=20,
+        help="Number of predicted boxes per image.",
+    )
+    parser.add_argument(
+        "--num_classes",
+        type=int,
+        default=600,
+        help="Number of classes.",
+    )
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Directory in which to generate the synthetic data. By default a"
+        " temporary directory is used.",
+    )
+    parser.add_argument(
+        "--keep_data",
+        action="store_true",
+        default=False,
+        help="If specified, the synthetic data is not deleted afterwards.",
+    )
+    parser.add_argument(
+        "--trace_memory",
+        action="store_true",
+        default=False,
+        help="If specified, the peak Python memory of each stage is traced."
+        " Tracing slows down the stages, so timings are not comparable with"
+        " untraced runs.",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        default=False,
+        help="If specified, the dataset is loaded in streaming mode.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        default=None,
+        type=int,
+        help="Number of worker processes to use to build the samples.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        default=1000,
+        type=int,
+        help="Number of samples to add or update at a time.",
+    )
+    args = parser.parse_args()
+
+    main(**vars(args))
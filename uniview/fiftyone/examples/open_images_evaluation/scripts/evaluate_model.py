@@ -9,6 +9,13 @@ said dataset has all necessary fields populated:
     - groundtruth_img_labels_field_name
     - prediction_field_name
 
+Several prediction fields can be evaluated against the same ground truth in
+one pass over the dataset. The true and false positive predictions of each
+field are written to fields suffixed by ``_TP`` and ``_FP`` in the same pass.
+
+The metrics can also be sliced by ground truth attributes, such as
+IsOccluded or the box size, in the same pass.
+
 Copyright 2017-2021, Voxel51, Inc.
 voxel51.com
 """
@@ -17,11 +24,14 @@ from pathlib import Path
 import sys
 
 import fiftyone as fo
-from fiftyone import ViewField as F
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from error_analysis.evaluation import evaluate_dataset
+from error_analysis.evaluation import evaluate_dataset, get_backend_names
+from error_analysis.numpy_evaluation import (
+    SLICE_ATTRIBUTES,
+    get_threshold_suffix,
+)
 
 
 def main(
@@ -31,33 +41,69 @@ def main(
     groundtruth_img_labels_field_name,
     prediction_field_name,
     iou_threshold,
+    backend,
+    num_workers,
+    batch_size,
+    incremental,
+    cache_dir,
+    slices,
 ):
     dataset = fo.load_dataset(dataset_name)
 
-    evaluate_dataset(
+    if len(iou_threshold) == 1:
+        iou_threshold = iou_threshold[0]
+        suffixes = {iou_threshold: ""}
+    else:
+        suffixes = {t: get_threshold_suffix(t) for t in iou_threshold}
+
+    prediction_field_names = prediction_field_name
+    if len(prediction_field_names) == 1:
+        prediction_field_name = prediction_field_names[0]
+
+    metrics = evaluate_dataset(
         dataset=dataset,
         label_map_path=label_map_path,
         groundtruth_loc_field_name=groundtruth_loc_field_name,
         groundtruth_img_labels_field_name=groundtruth_img_labels_field_name,
         prediction_field_name=prediction_field_name,
         iou_threshold=iou_threshold,
+        backend=backend,
+        num_workers=num_workers,
+        batch_size=batch_size,
+        incremental=incremental,
+        cache_dir=cache_dir,
+        split_predictions=True,
+        slices=slices,
     )
 
-    print("Cloning True Positives to a new field...")
-    tp_view = dataset.filter_detections(
-        prediction_field_name, F("eval") == "true_positive"
-    )
-    tp_view.clone_sample_field(
-        prediction_field_name, prediction_field_name + "_TP"
-    )
-
-    print("Cloning False Positives to a new field...")
-    fp_view = dataset.filter_detections(
-        prediction_field_name, F("eval") == "false_positive"
-    )
-    fp_view.clone_sample_field(
-        prediction_field_name, prediction_field_name + "_FP"
-    )
+    if isinstance(prediction_field_name, str):
+        metrics = {prediction_field_name: metrics}
+
+    for field_name in prediction_field_names:
+        for thresh, suffix in suffixes.items():
+            cur_metrics = metrics[field_name]
+            if suffix != "":
+                cur_metrics = cur_metrics[thresh]
+
+            print(
+                "Dataset mAP@%g of %s: %f"
+                % (thresh, field_name, cur_metrics["mAP"])
+            )
+
+            slice_metrics = cur_metrics.get("slices", {})
+            for attribute, value_metrics in slice_metrics.items():
+                for value, cur_slice_metrics in value_metrics.items():
+                    print(
+                        "    %s=%s: mAP %f, %d TP, %d FP, %d ground truth"
+                        % (
+                            attribute,
+                            value,
+                            cur_slice_metrics["mAP"],
+                            cur_slice_metrics["TP"],
+                            cur_slice_metrics["FP"],
+                            cur_slice_metrics["num_gt"],
+                        )
+                    )
 
 
 if __name__ == "__main__":
@@ -85,14 +131,62 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--prediction_field_name",
-        default="predicted_detections",
-        help="The name of the predicted detections field on the dataset.",
+        nargs="+",
+        default=["predicted_detections"],
+        help="The name of the predicted detections field on the dataset. If"
+        " several fields are provided, they are all evaluated in one pass and"
+        " the per-sample metrics of each field are stored in fields prefixed"
+        " by its name.",
     )
     parser.add_argument(
         "--iou_threshold",
+        nargs="+",
         type=float,
-        default=0.5,
-        help="IOU threhold",
+        default=[0.5],
+        help="IOU threhold. If several thresholds are provided, the results"
+        " at each threshold are stored in fields suffixed by the threshold in"
+        " percent, e.g. _50 for 0.5. Only the numpy backend computes the IoUs"
+        " once for all thresholds.",
+    )
+    parser.add_argument(
+        "--backend",
+        default="tensorflow",
+        choices=get_backend_names(),
+        help="The evaluation backend. The numpy backend does not require"
+        " Tensorflow.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        default=None,
+        type=int,
+        help="Number of worker processes to evaluate the samples with.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        default=1000,
+        type=int,
+        help="Number of samples whose results are written at a time.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="If specified, only the samples whose ground truth or"
+        " predictions changed since the last incremental evaluation are"
+        " re-evaluated.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help="Optional directory in which to cache the compiled label map.",
+    )
+    parser.add_argument(
+        "--slices",
+        nargs="+",
+        default=None,
+        choices=SLICE_ATTRIBUTES,
+        help="Ground truth attributes by which to slice the metrics. BoxSize"
+        " buckets the boxes into small, medium and large ones.",
     )
     args = parser.parse_args()
 
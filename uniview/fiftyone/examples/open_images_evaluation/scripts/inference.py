@@ -9,7 +9,6 @@ Copyright 2017-2021, Voxel51, Inc.
 voxel51.com
 """
 import argparse
-import glob
 from pathlib import Path
 import sys
 
@@ -18,6 +17,7 @@ import tensorflow as tf
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from error_analysis.images import iter_image_paths
 from error_analysis.inference.tfhub import (
     TensorFlowHubDetector,
     detections_to_csv,
@@ -30,10 +30,19 @@ def main(
     output_dir,
     output_format="tf_object_detection_api",
     save_every=10,
+    max_num_images=-1,
+    sample_fraction=None,
+    seed=None,
 ):
     # get list of paths to images
-    imgs_pattern = str(Path(images_dir).joinpath("*.jpg"))
-    img_paths = glob.glob(imgs_pattern)
+    img_paths = list(
+        iter_image_paths(
+            images_dir,
+            max_num_images=max_num_images,
+            sample_fraction=sample_fraction,
+            seed=seed,
+        )
+    )
 
     assert len(img_paths), "No images found in dir: %s" % images_dir
 
@@ -114,6 +123,24 @@ if __name__ == "__main__":
         type=int,
         help="How often to append the output to CSV",
     )
+    parser.add_argument(
+        "--max_num_images",
+        default=-1,
+        type=int,
+        help="Maximum number of images to process. -1 implies all images.",
+    )
+    parser.add_argument(
+        "--sample_fraction",
+        default=None,
+        type=float,
+        help="Fraction of the images to process, selected deterministically"
+        " based on a hash of their IDs.",
+    )
+    parser.add_argument(
+        "--seed",
+        default=None,
+        help="Seed for the --sample_fraction subsampling.",
+    )
     args = parser.parse_args()
 
     main(**vars(args))
@@ -50,7 +50,8 @@ if __name__ == "__main__":
     parser.add_argument(
         "--class_descriptions_path",
         default=None,
-        help="Path to the MID-to-Short-Description class name mapping CSV.",
+        help="Path to the MID-to-Short-Description class name mapping CSV, or"
+        " to a label map .pbtxt file.",
     )
     parser.add_argument(
         "--load_images_with_preds",
@@ -66,6 +67,65 @@ if __name__ == "__main__":
         type=int,
         help="Maximum number of images to load. -1 implies load all images.",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        default=False,
+        help="If specified, the CSVs are read in chunks rather than fully into"
+        " memory. Requires the CSVs to be sorted by ImageID.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        default=100000,
+        type=int,
+        help="Number of CSV rows to read at a time when streaming.",
+    )
+    parser.add_argument(
+        "--batch_size",
+        default=1000,
+        type=int,
+        help="Number of samples to add to the dataset at a time.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help="Directory in which to cache the parsed CSVs as Parquet files."
+        " Requires pyarrow.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        default=None,
+        type=int,
+        help="Number of worker processes to use to build the samples. By"
+        " default, the samples are built in the main process.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="If specified and the dataset already exists, only the images"
+        " that are not yet in it are added. Use this to resume an interrupted"
+        " load or to add new images.",
+    )
+    parser.add_argument(
+        "--images_from_annotations",
+        action="store_true",
+        default=False,
+        help="If specified, only images that appear in at least one of the"
+        " CSVs are loaded, and the images directory is not listed.",
+    )
+    parser.add_argument(
+        "--sample_fraction",
+        default=None,
+        type=float,
+        help="Fraction of the images to load, selected deterministically"
+        " based on a hash of their IDs.",
+    )
+    parser.add_argument(
+        "--seed",
+        default=None,
+        help="Seed for the --sample_fraction subsampling.",
+    )
     args = parser.parse_args()
 
     dataset = load_open_images_dataset(**vars(args))